@@ -1,18 +1,67 @@
-from flask import Flask, request, render_template_string
+from flask import Flask, Request, request, render_template_string, jsonify, g, Response
 import json
 import os
 import io
 import base64
-from datetime import datetime
-import pandas as pd
-from google.cloud import storage
-from google.cloud import bigquery
+import atexit
+import functools
+import importlib
+import itertools
+import mmap
+import queue
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from werkzeug.exceptions import RequestEntityTooLarge
 
-app = Flask(__name__)
 
-# In-memory record of recent uploads (max 10)
-recent_uploads = []
-recent_ingests = []
+class LazyLoader:
+    """Proxy for a module or client that is created on first attribute access.
+
+    Creation runs once, under a lock, so concurrent first requests share it.
+    Keeps pandas, pyarrow and the Google clients out of import time, which is
+    most of a cold start.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._value = None
+        self.loaded = False
+
+    def load(self):
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    self._value = self._loader()
+                    self.loaded = True
+        return self._value
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+
+def lazy_import(name):
+    return LazyLoader(lambda: importlib.import_module(name))
+
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+pa_csv = lazy_import("pyarrow.csv")
+pc = lazy_import("pyarrow.compute")
+pq = lazy_import("pyarrow.parquet")
+storage = lazy_import("google.cloud.storage")
+bigquery = lazy_import("google.cloud.bigquery")
+
+app = Flask(__name__)
 
 # Track selected dataset (persists across requests in this container)
 current_dataset = None
@@ -21,8 +70,171 @@ PROJECT_ID = os.environ.get("PROJECT_ID")
 BQ_DATASET = os.environ.get("BQ_DATASET")
 BQ_TABLE = os.environ.get("BQ_TABLE")
 
-storage_client = storage.Client() if PROJECT_ID else None
-bq_client = bigquery.Client() if PROJECT_ID else None
+# Streaming ingest: rows per parsed chunk and bytes per ranged GCS read
+INGEST_CHUNK_ROWS = int(os.environ.get("INGEST_CHUNK_ROWS", "100000"))
+GCS_READ_CHUNK_BYTES = int(os.environ.get("GCS_READ_CHUNK_BYTES", str(8 * 1024 * 1024)))
+# Staging tables of multi-chunk loads expire after this many hours, so one left
+# behind by a killed instance is cleaned up by BigQuery
+STAGING_TABLE_EXPIRATION_HOURS = float(os.environ.get("STAGING_TABLE_EXPIRATION_HOURS", "24"))
+
+# Ingest engine: "arrow" parses straight to Parquet and loads it with an explicit
+# schema; "pandas" keeps the DataFrame + autodetect path (also the fallback)
+INGEST_ENGINE = os.environ.get("INGEST_ENGINE", "arrow").lower()
+# Arrow reads up to 32 blocks ahead, so blocks stay small; column types are
+# inferred once from a larger head sample and pinned for the whole file
+ARROW_CSV_BLOCK_BYTES = int(os.environ.get("ARROW_CSV_BLOCK_BYTES", str(1024 * 1024)))
+ARROW_CSV_INFER_BYTES = int(os.environ.get("ARROW_CSV_INFER_BYTES", str(16 * 1024 * 1024)))
+# Where Parquet spool files are written before loading (None = system temp dir),
+# and the size at which the spool is rolled into a new part; the parts of a
+# larger load are appended to a staging table one at a time
+INGEST_SPOOL_DIR = os.environ.get("INGEST_SPOOL_DIR") or None
+INGEST_SPOOL_PART_BYTES = int(os.environ.get("INGEST_SPOOL_PART_BYTES", str(256 * 1024 * 1024)))
+
+# Parallel CSV parse for large objects (arrow engine): number of workers
+# (1 = off, 0 = one per CPU), "threads" (Arrow releases the GIL while parsing)
+# or "process", the minimum object size, and the target bytes per parsed range
+INGEST_PARSE_WORKERS = int(os.environ.get("INGEST_PARSE_WORKERS", "1"))
+INGEST_PARSE_MODE = os.environ.get("INGEST_PARSE_MODE", "threads").lower()
+INGEST_PARALLEL_MIN_BYTES = int(os.environ.get("INGEST_PARALLEL_MIN_BYTES", str(64 * 1024 * 1024)))
+INGEST_PARALLEL_RANGE_BYTES = int(os.environ.get("INGEST_PARALLEL_RANGE_BYTES", str(32 * 1024 * 1024)))
+
+# CSV objects at least this large are loaded by BigQuery straight from their
+# gs:// URI (negative disables); only the head sample is downloaded, to infer
+# and check the schema
+INGEST_URI_LOAD_MIN_BYTES = int(os.environ.get("INGEST_URI_LOAD_MIN_BYTES", str(64 * 1024 * 1024)))
+INGEST_URI_SAMPLE_BYTES = int(os.environ.get("INGEST_URI_SAMPLE_BYTES", str(1024 * 1024)))
+
+# Async ingest queue behind /hook: worker count, "thread" or "process" execution,
+# max queued jobs before /hook pushes back, and finished jobs kept for /jobs/<id>.
+# Jobs run after their Pub/Sub message is acked: deploy with CPU always allocated
+# (--no-cpu-throttling, see cloudbuild.yaml), and note that a failed or dropped
+# job is not redelivered; re-run it with /backfill
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "2"))
+INGEST_WORKER_MODE = os.environ.get("INGEST_WORKER_MODE", "thread").lower()
+INGEST_QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", "100"))
+INGEST_JOB_HISTORY = int(os.environ.get("INGEST_JOB_HISTORY", "500"))
+# Seconds to let queued ingests finish when the container shuts down
+INGEST_SHUTDOWN_GRACE = float(os.environ.get("INGEST_SHUTDOWN_GRACE", "8"))
+
+# Processed-object index that lets /hook ack duplicate deliveries without
+# re-ingesting: backend "sqlite" (default), "memory" or "none"
+PROCESSED_INDEX_BACKEND = os.environ.get("PROCESSED_INDEX_BACKEND", "sqlite").lower()
+PROCESSED_INDEX_PATH = os.environ.get(
+    "PROCESSED_INDEX_PATH", os.path.join(tempfile.gettempdir(), "processed_objects.sqlite3"))
+
+# Backfills of existing objects (POST /backfill, `python app.py backfill`): SQLite
+# file holding progress and resume checkpoints, objects listed per page, and
+# default and maximum parallel ingests, and max objects started per second
+# (0 = no limit)
+BACKFILL_STATE_PATH = os.environ.get(
+    "BACKFILL_STATE_PATH", os.path.join(tempfile.gettempdir(), "backfills.sqlite3"))
+BACKFILL_PAGE_SIZE = int(os.environ.get("BACKFILL_PAGE_SIZE", "1000"))
+BACKFILL_CONCURRENCY = int(os.environ.get("BACKFILL_CONCURRENCY", "4"))
+BACKFILL_MAX_CONCURRENCY = int(os.environ.get("BACKFILL_MAX_CONCURRENCY", str(max(BACKFILL_CONCURRENCY, 64))))
+BACKFILL_RATE = float(os.environ.get("BACKFILL_RATE", "0"))
+# Durable copy of backfill state (gs://bucket/prefix/, one JSON object per
+# backfill, written at most every BACKFILL_STATE_FLUSH_SECONDS and on every
+# status change) so any instance, or the CLI elsewhere, can resume; the local
+# SQLite file alone does not survive an instance being replaced, so POST
+# /backfill refuses to start without it
+BACKFILL_STATE_URI = os.environ.get("BACKFILL_STATE_URI") or None
+BACKFILL_STATE_FLUSH_SECONDS = float(os.environ.get("BACKFILL_STATE_FLUSH_SECONDS", "5"))
+# /backfill* requires "Authorization: Bearer <BACKFILL_API_TOKEN>" (disabled
+# when unset), and only buckets in BACKFILL_BUCKETS (comma-separated; empty =
+# any) can be backfilled through it
+BACKFILL_API_TOKEN = os.environ.get("BACKFILL_API_TOKEN") or None
+BACKFILL_BUCKETS = {b.strip() for b in os.environ.get("BACKFILL_BUCKETS", "").split(",") if b.strip()}
+
+# Directory for cProfile dumps of ingests queued with /hook?profile=1
+PROFILE_DIR = os.environ.get("PROFILE_DIR", tempfile.gettempdir())
+
+# Multi-bucket uploads from the UI: max parallel uploads, and uploads at or above
+# the threshold go through resumable uploads in chunks (multiple of 256 KiB)
+UPLOAD_CONCURRENCY = int(os.environ.get("UPLOAD_CONCURRENCY", "4"))
+UPLOAD_RESUMABLE_THRESHOLD = int(os.environ.get("UPLOAD_RESUMABLE_THRESHOLD", str(8 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+# Requests at or above this size spool uploaded files to a temp file that is
+# memory-mapped for the preview and streamed to GCS; larger requests than
+# UPLOAD_MAX_BYTES are rejected with 413 before the body is read (0 = no limit)
+UPLOAD_SPOOL_THRESHOLD = int(os.environ.get("UPLOAD_SPOOL_THRESHOLD", str(8 * 1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Excel ingest: rows per streamed batch, and whether every sheet is loaded into
+# its own <object>__<sheet> table (default: first sheet only)
+EXCEL_BATCH_ROWS = int(os.environ.get("EXCEL_BATCH_ROWS", "50000"))
+EXCEL_ALL_SHEETS = os.environ.get("EXCEL_ALL_SHEETS", "").lower() in ("1", "true", "yes")
+
+# Incremental ingest: JSON map of object-name prefix -> target table. The value is
+# a table name or {"table", "dataset", "mode", "partition_field", "partition_type"};
+# mode "append" (default) appends each object version once, "partition" replaces
+# the partition (partition_type DAY, MONTH or YEAR; default DAY) named by the date
+# in the object path; objects whose path has no such date fail. Routes are checked
+# at startup. Unrouted objects keep getting their own table, truncated on every load.
+#   {"data/events/": {"table": "events", "partition_field": "event_date"},
+#    "exports/daily/": {"table": "daily", "mode": "partition"}}
+INGEST_TABLE_ROUTES = json.loads(os.environ.get("INGEST_TABLE_ROUTES", "") or "{}")
+
+# Column contracts checked between parsing and loading: JSON (or the path of a
+# JSON file) mapping table name -> {"columns": {name: spec}, "max_invalid_ratio"}.
+# A spec is a BigQuery type or {"type" (default STRING), "nullable" (default
+# true), "min", "max", "allowed", "pattern"}. Contract columns are read as text
+# and coerced to their type; rows that break the contract are written to a
+# dead-letter object instead of failing the file, and the ingest fails before
+# any load job if more than max_invalid_ratio of the rows were rejected.
+#   {"orders": {"columns": {"id": {"type": "INTEGER", "nullable": false, "min": 1},
+#                           "placed": "DATE", "status": {"allowed": ["new", "paid"]}},
+#               "max_invalid_ratio": 0.01}}
+INGEST_CONTRACTS = os.environ.get("INGEST_CONTRACTS", "").strip()
+if INGEST_CONTRACTS and not INGEST_CONTRACTS.startswith("{"):
+    with open(INGEST_CONTRACTS) as f:
+        INGEST_CONTRACTS = f.read()
+INGEST_CONTRACTS = json.loads(INGEST_CONTRACTS or "{}")
+# Rejected rows are written as NDJSON under this prefix, in this bucket (default:
+# the source object's bucket); /hook ignores objects under the prefix
+DEAD_LETTER_BUCKET = os.environ.get("DEAD_LETTER_BUCKET") or None
+DEAD_LETTER_PREFIX = os.environ.get("DEAD_LETTER_PREFIX", "dead-letter/")
+
+# Rows parsed for the upload preview table
+PREVIEW_ROWS = int(os.environ.get("PREVIEW_ROWS", "5"))
+
+# ingestion_log records are buffered and written in batches: flush when this
+# many are pending or this many seconds have passed, whichever comes first
+INGEST_LOG_BATCH_SIZE = int(os.environ.get("INGEST_LOG_BATCH_SIZE", "50"))
+INGEST_LOG_FLUSH_SECONDS = float(os.environ.get("INGEST_LOG_FLUSH_SECONDS", "10"))
+
+# Metadata cache for index(): seconds to keep bucket/dataset listings, and max
+# entries before least-recently-used eviction
+METADATA_CACHE_TTL = float(os.environ.get("METADATA_CACHE_TTL", "60"))
+METADATA_CACHE_SIZE = int(os.environ.get("METADATA_CACHE_SIZE", "128"))
+
+# Local ingest history behind the dashboard and /ingestions: SQLite file (":memory:"
+# keeps it per process), records kept, and ingestion_log rows read from BigQuery
+# to seed a dataset's history on a cold start
+INGEST_HISTORY_PATH = os.environ.get(
+    "INGEST_HISTORY_PATH", os.path.join(tempfile.gettempdir(), "ingest_history.sqlite3"))
+INGEST_HISTORY_MAX_ROWS = int(os.environ.get("INGEST_HISTORY_MAX_ROWS", "10000"))
+INGEST_HISTORY_SEED_ROWS = int(os.environ.get("INGEST_HISTORY_SEED_ROWS", "1000"))
+
+# Import pandas/pyarrow and build the Google clients in the background at
+# startup instead of on the first request that needs them
+WARMUP_ON_START = os.environ.get("WARMUP_ON_START", "").lower() in ("1", "true", "yes")
+
+
+def ingestion_log_schema():
+    return [
+        bigquery.SchemaField("bucket", "STRING"),
+        bigquery.SchemaField("object_name", "STRING"),
+        bigquery.SchemaField("bq_dataset", "STRING"),
+        bigquery.SchemaField("bq_table", "STRING"),
+        bigquery.SchemaField("rows_loaded", "INTEGER"),
+        bigquery.SchemaField("status", "STRING"),
+        bigquery.SchemaField("timestamp", "TIMESTAMP"),
+    ]
+
+
+# Clients are created on first use (see LazyLoader)
+storage_client = LazyLoader(lambda: storage.Client()) if PROJECT_ID else None
+bq_client = LazyLoader(lambda: bigquery.Client()) if PROJECT_ID else None
 
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -70,6 +282,13 @@ HTML_TEMPLATE = """
                 <div class="info-item"><span class="badge">GET</span> <strong>/</strong> UI + status</div>
                 <div class="info-item"><span class="badge" style="background:#ff9800;">POST</span> <strong>/</strong> Upload CSV / Excel</div>
                 <div class="info-item"><span class="badge" style="background:#009688;">POST</span> <strong>/hook</strong> Pub/Sub JSON trigger (GCS)</div>
+                <div class="info-item"><span class="badge">GET</span> <strong>/jobs/&lt;id&gt;</strong> Ingest job status</div>
+                <div class="info-item"><span class="badge" style="background:#009688;">POST</span> <strong>/backfill</strong> Ingest a whole gs:// prefix; <span class="badge">GET</span> <strong>/backfill/&lt;id&gt;</strong> progress</div>
+                <div class="info-item"><span class="badge">GET</span> <strong>/ingestions?cursor=</strong> Ingest history, newest first</div>
+                <div class="info-item"><span class="badge">GET</span> <strong>/cache/stats</strong> Metadata cache hits/misses</div>
+                <div class="info-item"><span class="badge">GET</span> <strong>/processed/stats</strong> Ingested objects / skipped duplicates</div>
+                <div class="info-item"><span class="badge">GET</span> <strong>/metrics</strong> Prometheus metrics</div>
+                <div class="info-item"><span class="badge">GET</span> <strong>/healthz</strong> Liveness, <strong>/warmup</strong> finish startup</div>
             </div>
 
             <div class="panel">
@@ -133,22 +352,31 @@ HTML_TEMPLATE = """
             <div class="info-item" style="margin-top:10px;"><strong>{{ message }}</strong></div>
             {% endif %}
             {% if upload_results %}
-            <div style="margin-top:15px;padding:10px;background:#e8f5e9;border-radius:4px;">
+            {% set failed_uploads = upload_results|selectattr("error")|list %}
+            <div style="margin-top:15px;padding:10px;background:{{ '#fff3e0' if failed_uploads else '#e8f5e9' }};border-radius:4px;">
+                {% if failed_uploads %}
+                <h3 style="margin:0 0 10px 0;color:#e65100;">⚠️ Upload Finished With Errors</h3>
+                {% else %}
                 <h3 style="margin:0 0 10px 0;color:#2e7d32;">✅ Upload Complete</h3>
+                {% endif %}
                 {% for result in upload_results %}
                 <div class="info-item" style="margin:5px 0;">
                     <strong>Bucket:</strong> {{ result.bucket }}<br/>
                     <strong>Object:</strong> {{ result.object }}<br/>
+                    {% if result.error %}
+                    <strong style="color:#c62828;">Failed:</strong> {{ result.error }}
+                    {% else %}
                     <strong>URL:</strong> <code style="font-size:11px;background:#fff;padding:2px 4px;border-radius:2px;">gs://{{ result.bucket }}/{{ result.object }}</code><br/>
                     <strong>BigQuery Table:</strong> <code style="font-size:11px;background:#fff;padding:2px 4px;border-radius:2px;">{{ result.bq_table }}</code><br/>
                     <small style="color:#666;">Auto-ingestion will start in ~10 seconds</small>
+                    {% endif %}
                 </div>
                 {% endfor %}
             </div>
             {% endif %}
             {% if preview %}
             <div class="uploads">
-                <div class="info-item"><strong>File:</strong> {{ preview.name }} ({{ preview.rows }} rows, {{ preview.cols }} cols)</div>
+                <div class="info-item"><strong>File:</strong> {{ preview.name }} ({% if preview.rows_estimated %}~{% endif %}{{ preview.rows if preview.rows is not none else '?' }} rows, {{ preview.cols }} cols)</div>
                 <div class="info-item"><strong>Preview (first {{ preview.sample_rows|length }} rows):</strong></div>
                 <table>
                     <thead>
@@ -177,7 +405,7 @@ HTML_TEMPLATE = """
                         <td>{{ u.timestamp }}</td>
                         <td>{{ u.name }}</td>
                         <td>{{ u.kind }}</td>
-                        <td>{{ u.rows }}</td>
+                        <td>{% if u.rows_estimated %}~{% endif %}{{ u.rows if u.rows is not none else '?' }}</td>
                         <td>{{ u.cols }}</td>
                     </tr>
                     {% endfor %}
@@ -196,15 +424,19 @@ HTML_TEMPLATE = """
                 <tbody>
                     {% for g in ingests %}
                     <tr>
-                        <td>{{ g.timestamp }}</td>
+                        <td>{{ g.timestamp[:19] }}Z</td>
                         <td>{{ g.bucket }}/{{ g.name }}</td>
-                        <td><code style="font-size:11px;background:#f5f5f5;padding:2px 4px;border-radius:2px;">{{ g.bq_dataset }}.{{ g.bq_table }}</code></td>
-                        <td>{{ g.row_count }}</td>
+                        <td><code style="font-size:11px;background:#f5f5f5;padding:2px 4px;border-radius:2px;">{{ g.bq_dataset }}.{{ g.bq_table or '-' }}</code></td>
+                        <td>{{ g.rows_loaded }}</td>
                         <td>{{ g.status }}</td>
                     </tr>
                     {% endfor %}
                 </tbody>
             </table>
+            <div style="margin-top:8px;font-size:13px;">
+                {% if paged %}<a href="/">« Newest</a>{% endif %}
+                {% if ingests_cursor %}<a href="/?cursor={{ ingests_cursor }}" style="float:right;">Older »</a>{% endif %}
+            </div>
             {% else %}
             <div class="info-item">No ingestions yet. GCS upload should trigger /hook via Pub/Sub.</div>
             {% endif %}
@@ -220,140 +452,2895 @@ HTML_TEMPLATE = """
 """
 
 
-def parse_upload(file_storage):
-    """Parse CSV or Excel upload and return metadata plus sample rows."""
+def count_csv_records(data, chunk_size=8 * 1024 * 1024):
+    """Count CSV data records (header excluded) without parsing any fields.
+
+    Scans in chunks and tracks quote parity, so newlines inside quoted fields
+    are not counted; an escaped ``""`` toggles twice and leaves it unchanged.
+    Lines holding nothing but spaces, tabs or ``\\r`` are skipped, as pandas
+    skips them.
+    """
+    import re
+    blank_line = re.compile(rb"^[ \t\r]*\n", re.M)
+    maybe_blank = re.compile(rb"\n[ \t\r\n]")
+    records = 0
+    in_quotes = False
+    line_has_content = False  # the current (unterminated) line has a non-blank byte
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start:start + chunk_size]
+        parts = [chunk] if not in_quotes and b'"' not in chunk else chunk.split(b'"')
+        for i, part in enumerate(parts):
+            if i:
+                in_quotes = not in_quotes
+                line_has_content = True
+            if in_quotes or not part:
+                continue
+            newlines = part.count(b"\n")
+            if not newlines:
+                line_has_content = line_has_content or bool(part.strip(b" \t\r"))
+                continue
+            records += newlines
+            if part[:1] in b" \t\r\n" or maybe_blank.search(part):
+                records -= len(blank_line.findall(part))
+                # A match at the start of the part only counts if the line began blank
+                if line_has_content and blank_line.match(part):
+                    records += 1
+            line_has_content = bool(part[part.rfind(b"\n") + 1:].strip(b" \t\r"))
+    records += 1 if line_has_content else 0
+    return max(records - 1, 0)
+
+
+def count_excel_rows(buf):
+    """Data rows on the first sheet from the workbook's stored dimensions.
+
+    Returns ``(rows, estimated)``; the dimension can include trailing formatted
+    but empty rows, so the count is marked as an estimate.
+    """
+    import openpyxl
+    wb = openpyxl.load_workbook(buf, read_only=True)
+    try:
+        max_row = wb.worksheets[0].max_row
+    finally:
+        wb.close()
+    if max_row is None:
+        return None, True
+    return max(max_row - 1, 0), True
+
+
+class UploadRequest(Request):
+    """Spools uploaded files of large requests to a named temp file on disk.
+
+    Werkzeug's default keeps up to 500 KB in memory and rolls over to an
+    anonymous file; a named one can be memory-mapped and reopened by each
+    bucket upload. Requests without a length are spooled too.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is None or total_content_length >= UPLOAD_SPOOL_THRESHOLD:
+            return tempfile.NamedTemporaryFile("wb+", suffix=".upload", dir=INGEST_SPOOL_DIR)
+        return io.BytesIO()
+
+
+app.request_class = UploadRequest
+app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_BYTES or None
+
+
+@contextmanager
+def open_upload(file_storage):
+    """Yield ``(data, source)`` for an uploaded file without extra copies.
+
+    A file spooled to disk by UploadRequest is memory-mapped as ``data`` and
+    its path is the ``source`` for upload_to_buckets(); a small one is read
+    into bytes, which serve as both.
+    """
+    stream = file_storage.stream
+    path = getattr(stream, "name", None)
+    if isinstance(path, str) and os.path.isfile(path):
+        stream.flush()
+        if os.path.getsize(path):
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm, path
+            return
+    data = file_storage.read()
+    yield data, data
+
+
+class MappedFile(io.RawIOBase):
+    """Read-only, seekable file over a memory map, with its own position."""
+
+    def __init__(self, mm):
+        self._mm = mm
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        chunk = self._mm[self._pos:self._pos + len(b)]
+        b[:len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._mm)}[whence]
+        self._pos = max(base + offset, 0)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+def _upload_buffer(data):
+    """Fresh file-like view of upload ``data`` (bytes or mmap) at offset 0."""
+    if isinstance(data, mmap.mmap):
+        return io.BufferedReader(MappedFile(data))
+    return io.BytesIO(data)
+
+
+def parse_upload(file_storage, data=None, sample_size=PREVIEW_ROWS):
+    """Parse CSV or Excel upload and return metadata plus sample rows.
+
+    Only the first ``sample_size`` rows are parsed; the row count comes from a
+    record counter instead. Pass ``data`` (bytes, or an mmap from
+    open_upload()) to reuse contents already read.
+    """
     filename = file_storage.filename or "upload"
     ext = filename.lower()
-    data = file_storage.read()
-    buf = io.BytesIO(data)
+    if data is None:
+        data = file_storage.read()
+    rows_estimated = False
 
     if ext.endswith(".csv"):
-        df = pd.read_csv(buf)
+        df = pd.read_csv(_upload_buffer(data), nrows=sample_size)
+        rows = count_csv_records(data)
         kind = "csv"
     elif ext.endswith(".xls") or ext.endswith(".xlsx"):
-        df = pd.read_excel(buf)
+        df = pd.read_excel(_upload_buffer(data), nrows=sample_size)
+        try:
+            rows, rows_estimated = count_excel_rows(_upload_buffer(data))
+        except Exception:
+            rows, rows_estimated = None, True
         kind = "excel"
     else:
         raise ValueError("Unsupported file type. Upload .csv or .xlsx")
 
-    rows, cols = df.shape
-    sample_rows = df.head(5).fillna("").astype(str).values.tolist()
+    cols = df.shape[1]
+    sample_rows = df.head(sample_size).fillna("").astype(str).values.tolist()
     columns = list(df.columns.astype(str))
     return {
         "name": filename,
         "kind": kind,
         "rows": rows,
+        "rows_estimated": rows_estimated,
         "cols": cols,
         "columns": columns,
         "sample_rows": sample_rows,
     }
 
 
-def load_to_bigquery(df, source_bucket, source_object):
-    """Load CSV/Excel data to BigQuery and log metadata to ingestion_log table."""
+def _label_str(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    """Monotonic counter with optional labels, rendered in Prometheus text format."""
+
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name + _label_str(self.labelnames, k), v) for k, v in self._values.items()]
+
+
+class Histogram(Counter):
+    """Cumulative-bucket histogram with optional labels."""
+
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            state = self._values.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, state in self._values.items():
+                for bound, count in zip(self.buckets, state["buckets"]):
+                    out.append((self.name + "_bucket" + _label_str(self.labelnames, key, [("le", bound)]), count))
+                out.append((self.name + "_bucket" + _label_str(self.labelnames, key, [("le", "+Inf")]), state["count"]))
+                out.append((self.name + "_sum" + _label_str(self.labelnames, key), state["sum"]))
+                out.append((self.name + "_count" + _label_str(self.labelnames, key), state["count"]))
+        return out
+
+
+class CallbackMetric:
+    """Metric whose samples are read from ``fn() -> {labels_tuple_or_None: value}`` at scrape time."""
+
+    def __init__(self, name, help, type, fn, labelnames=()):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.labelnames = tuple(labelnames)
+        self._fn = fn
+
+    def samples(self):
+        return [(self.name + _label_str(self.labelnames, k or ()), v) for k, v in self._fn().items()]
+
+
+class MetricsRegistry:
+    """Collects metrics and renders them for /metrics."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = metric.samples()
+            except Exception as exc:  # a broken callback must not take down the scrape
+                print(f"Metric {metric.name} failed: {exc}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(f"{name} {value}" for name, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+INGEST_STAGE_SECONDS = metrics.register(Histogram(
+    "ingest_stage_seconds", "Time spent per ingest stage (nested stages excluded).", ["stage"]))
+INGEST_SECONDS = metrics.register(Histogram(
+    "ingest_duration_seconds", "End-to-end ingest time per object.", ["status"]))
+INGESTS_TOTAL = metrics.register(Counter("ingests_total", "Finished ingests.", ["status"]))
+INGEST_BYTES = metrics.register(Counter("ingest_downloaded_bytes_total", "Bytes read from GCS by ingests."))
+INGEST_ROWS = metrics.register(Histogram(
+    "ingest_rows", "Rows parsed per ingest.", buckets=(1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8)))
+INGEST_COLUMNS = metrics.register(Histogram(
+    "ingest_columns", "Columns parsed per ingest.", buckets=(1, 5, 10, 25, 50, 100, 250, 1000)))
+INGEST_REJECTED_ROWS = metrics.register(Counter(
+    "ingest_rejected_rows_total", "Rows rejected by column contracts and dead-lettered."))
+INGEST_PEAK_RSS = metrics.register(Histogram(
+    "ingest_peak_rss_bytes", "Process peak RSS during an ingest (and any ingests overlapping it).",
+    buckets=tuple(mb * 1024 * 1024 for mb in (128, 256, 512, 1024, 2048, 4096, 8192))))
+HTTP_SECONDS = metrics.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route.", ["route", "method", "status"]))
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process (VmHWM) since the last
+    reset_peak_rss(), or None if unavailable."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+_ingests_running = 0
+_ingests_running_lock = threading.Lock()
+
+
+def reset_peak_rss():
+    """Reset VmHWM to the current RSS (Linux: "5" to /proc/self/clear_refs)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def begin_ingest_rss():
+    """Start a peak-RSS window for an ingest.
+
+    The mark is per process, so it is only reset when no other ingest is
+    running: with concurrent workers an ingest's peak covers its whole run and
+    includes whatever ingests overlapped it.
+    """
+    global _ingests_running
+    with _ingests_running_lock:
+        if _ingests_running == 0:
+            reset_peak_rss()
+        _ingests_running += 1
+
+
+def end_ingest_rss():
+    """Close an ingest's peak-RSS window; returns its peak in bytes (or None)."""
+    global _ingests_running
+    with _ingests_running_lock:
+        _ingests_running -= 1
+        return peak_rss_bytes()
+
+
+class IngestTrace:
+    """Per-ingest stage timings and byte counts.
+
+    Stages nest; time spent in an inner stage (e.g. download reads pulled by the
+    parser) is excluded from the outer one so the totals add up. Stages are
+    entered on the thread that created the trace; work done for the ingest on
+    other threads (Arrow's I/O pool reading the object) is added with
+    add_background().
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.bytes_downloaded = 0
+        self._stack = []
+        self._lock = threading.Lock()
+        self._owner = threading.get_ident()
+
+    def on_owner_thread(self):
+        return threading.get_ident() == self._owner
+
+    @contextmanager
+    def stage(self, name):
+        frame = [time.perf_counter(), 0.0]
+        with self._lock:
+            self._stack.append(frame)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stack.pop()
+                elapsed = time.perf_counter() - frame[0]
+                self.stages[name] = self.stages.get(name, 0.0) + max(elapsed - frame[1], 0.0)
+                if self._stack:
+                    self._stack[-1][1] += elapsed
+
+    def add_background(self, name, seconds):
+        """Charge ``seconds`` spent on another thread to ``name``, taking them out
+        of the stage the ingest thread is in (it was waiting on that work)."""
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+            if self._stack:
+                self._stack[-1][1] += seconds
+
+    def add_download(self, nbytes):
+        with self._lock:
+            self.bytes_downloaded += nbytes
+
+
+_trace_local = threading.local()
+
+
+@contextmanager
+def stage(name):
+    """Time a block as ``name`` in the current thread's ingest trace, if any."""
+    trace = getattr(_trace_local, "trace", None)
+    if trace is None:
+        yield
+        return
+    with trace.stage(name):
+        yield
+
+
+def record_download(nbytes):
+    """Add downloaded bytes to the current thread's ingest trace, if any."""
+    trace = getattr(_trace_local, "trace", None)
+    if trace is not None:
+        trace.add_download(nbytes)
+
+
+class CountingReader(io.RawIOBase):
+    """Read-only file wrapper that records reads as the "download" stage.
+
+    The trace is captured when the reader is created: Arrow's CSV reader calls
+    read() from its own I/O threads, where no trace is set.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._trace = getattr(_trace_local, "trace", None)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return self._raw.seekable()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._raw.seek(offset, whence)
+
+    def tell(self):
+        return self._raw.tell()
+
+    def read(self, size=-1):
+        trace = self._trace
+        if trace is None:
+            return self._raw.read(size)
+        if trace.on_owner_thread():
+            with trace.stage("download"):
+                data = self._raw.read(size)
+        else:
+            start = time.perf_counter()
+            data = self._raw.read(size)
+            trace.add_background("download", time.perf_counter() - start)
+        trace.add_download(len(data))
+        return data
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache whose entries expire after a TTL."""
+
+    _MISSING = object()
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return the cached value, or call ``loader()`` and cache its result.
+
+        Exceptions from ``loader`` propagate and nothing is cached.
+        """
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, *keys):
+        """Drop the given keys, or every entry when called without keys."""
+        with self._lock:
+            if not keys:
+                self._entries.clear()
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+            }
+
+
+metadata_cache = TTLCache(METADATA_CACHE_SIZE, METADATA_CACHE_TTL)
+
+
+class IngestionLogWriter:
+    """Buffers ingestion_log records and writes them with one load job per batch.
+
+    A background thread flushes every ``flush_interval`` seconds, or as soon as
+    ``batch_size`` records are pending. Records that fail to write are kept for
+    the next flush (up to ``max_pending``).
+    """
+
+    def __init__(self, batch_size, flush_interval, max_pending=10000):
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, table_id, record):
+        with self._lock:
+            self._buffer.append((table_id, record))
+            full = len(self._buffer) >= self._batch_size
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ingestion-log-writer", daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """Write all buffered records, grouped by destination table."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            by_table = OrderedDict()
+            for table_id, record in batch:
+                by_table.setdefault(table_id, []).append(record)
+
+            failed = []
+            for table_id, records in by_table.items():
+                job_config = bigquery.LoadJobConfig(
+                    source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+                    write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+                    schema=ingestion_log_schema(),
+                    # Tables created before bq_dataset/bq_table existed gain the columns
+                    schema_update_options=[bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION],
+                )
+                try:
+                    flush_start = time.perf_counter()
+                    bq_client.load_table_from_json(records, table_id, job_config=job_config).result()
+                    INGEST_STAGE_SECONDS.observe(time.perf_counter() - flush_start, stage="log_flush")
+                except Exception as exc:
+                    print(f"Failed to write {len(records)} ingestion_log record(s) to {table_id}: {exc}")
+                    failed.extend((table_id, record) for record in records)
+
+            if failed:
+                with self._lock:
+                    self._buffer[:0] = failed
+                    del self._buffer[:-self._max_pending]
+
+    def _run(self):
+        while True:
+            self._wake.wait(self._flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+ingestion_log = IngestionLogWriter(INGEST_LOG_BATCH_SIZE, INGEST_LOG_FLUSH_SECONDS)
+# Registered before the ingest queue's drain so it runs after it (atexit is LIFO)
+atexit.register(ingestion_log.flush)
+
+
+def _sortable_timestamp(value):
+    """ISO timestamp with fixed microsecond precision, so strings sort by time."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.rstrip("Z").replace(" ", "T"))
+    return value.replace(tzinfo=None).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class IngestHistory:
+    """Recent ingests and uploads in a local SQLite file.
+
+    Fed by the ingest path as records are produced, so the dashboard and
+    /ingestions never query BigQuery; a dataset's older ingestion_log rows are
+    read once on a cold start (see seed()). Pages are keyset-paginated on
+    (timestamp, id), newest first.
+    """
+
+    def __init__(self, path, max_rows=10000, max_uploads=10):
+        self._lock = threading.Lock()
+        self._max_rows = max_rows
+        self._max_uploads = max_uploads
+        self._seeded = set()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS ingestions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    bucket TEXT,
+                    object_name TEXT,
+                    bq_dataset TEXT,
+                    bq_table TEXT,
+                    rows_loaded INTEGER,
+                    status TEXT
+                );
+                CREATE INDEX IF NOT EXISTS ingestions_by_dataset
+                    ON ingestions (bq_dataset, timestamp, id);
+                CREATE TABLE IF NOT EXISTS seeded_datasets (dataset TEXT PRIMARY KEY);
+                CREATE TABLE IF NOT EXISTS uploads (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    preview TEXT NOT NULL
+                );
+            """)
+            self._seeded.update(r[0] for r in self._conn.execute("SELECT dataset FROM seeded_datasets"))
+
+    def add(self, record):
+        """Store one ingestion_log-shaped record."""
+        self.add_many([record])
+
+    def add_many(self, records):
+        rows = [(
+            _sortable_timestamp(r["timestamp"]), r.get("bucket"), r.get("object_name"),
+            r.get("bq_dataset"), r.get("bq_table"), r.get("rows_loaded"), r.get("status"),
+        ) for r in records]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO ingestions (timestamp, bucket, object_name, bq_dataset, bq_table, rows_loaded, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute(
+                "DELETE FROM ingestions WHERE id <= (SELECT MAX(id) FROM ingestions) - ?", (self._max_rows,))
+
+    def page(self, dataset, cursor=None, limit=10):
+        """Up to ``limit`` records for ``dataset`` older than ``cursor``, newest first.
+
+        Returns ``(records, next_cursor)``; next_cursor is None on the last page.
+        """
+        sql = ("SELECT id, timestamp, bucket, object_name, bq_dataset, bq_table, rows_loaded, status "
+               "FROM ingestions WHERE bq_dataset = ?")
+        params = [dataset]
+        if cursor:
+            sql += " AND (timestamp, id) < (?, ?)"
+            params.extend(cursor)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        records = [{
+            "timestamp": r[1], "bucket": r[2], "name": r[3], "bq_dataset": r[4],
+            "bq_table": r[5], "rows_loaded": r[6], "status": r[7],
+        } for r in rows[:limit]]
+        next_cursor = (rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+        return records, next_cursor
+
+    def seed(self, dataset, loader):
+        """Backfill a dataset's history once from ``loader(before)``.
+
+        ``loader`` returns ingestion_log records older than ``before`` (the
+        oldest local record's timestamp, or None), so rows this instance logged
+        itself are not duplicated. If the log doesn't exist yet (NotFound) the
+        dataset counts as seeded with nothing; any other failure is retried on
+        the next call.
+        """
+        from google.api_core.exceptions import NotFound
+
+        if dataset in self._seeded:
+            return
+        with self._lock:
+            before = self._conn.execute(
+                "SELECT MIN(timestamp) FROM ingestions WHERE bq_dataset = ?", (dataset,)).fetchone()[0]
+        try:
+            records = loader(before)
+        except NotFound as exc:
+            print(f"No ingestion log to seed history for {dataset} from: {exc}")
+            records = []
+        except Exception as exc:
+            print(f"Failed to seed ingest history for {dataset}: {exc}")
+            return
+        self.add_many([{**r, "bq_dataset": r.get("bq_dataset") or dataset} for r in records])
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO seeded_datasets VALUES (?)", (dataset,))
+        self._seeded.add(dataset)
+
+    def add_upload(self, preview):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO uploads (preview) VALUES (?)", (json.dumps(preview, default=str),))
+            self._conn.execute(
+                "DELETE FROM uploads WHERE id <= (SELECT MAX(id) FROM uploads) - ?", (self._max_uploads,))
+
+    def uploads(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT preview FROM uploads ORDER BY id DESC").fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+
+def encode_cursor(cursor):
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode() if cursor else None
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor(); raises ValueError for a malformed token."""
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return str(timestamp), int(row_id)
+    except Exception as exc:
+        raise ValueError(f"Invalid cursor: {token!r}") from exc
+
+
+def load_ingestion_log(dataset, before=None, limit=INGEST_HISTORY_SEED_ROWS):
+    """Newest ingestion_log rows in ``dataset`` older than ``before`` (one query job)."""
+    query = f"""
+        SELECT bucket, object_name, bq_dataset, bq_table, rows_loaded, status, timestamp
+        FROM `{PROJECT_ID}.{dataset}.ingestion_log`
+        {"WHERE timestamp < @before" if before else ""}
+        ORDER BY timestamp DESC
+        LIMIT {int(limit)}
+    """
+    params = [bigquery.ScalarQueryParameter("before", "TIMESTAMP", datetime.fromisoformat(before.rstrip("Z")))] if before else []
+    job = bq_client.query(query, job_config=bigquery.QueryJobConfig(query_parameters=params))
+    return [dict(row) for row in job.result()]
+
+
+ingest_history = IngestHistory(INGEST_HISTORY_PATH, INGEST_HISTORY_MAX_ROWS)
+
+
+def upload_to_buckets(source, object_name, bucket_names, content_type=None):
+    """Upload the same bytes, or local file, to several buckets concurrently.
+
+    ``source`` is bytes or a file path; each bucket streams its own handle on
+    the file. Returns one ``{"bucket", "object", "error"}`` dict per bucket, in
+    input order; a failed bucket is reported instead of aborting the others.
+    """
+    size = os.path.getsize(source) if isinstance(source, str) else len(source)
+
+    def _upload(bucket_name):
+        blob = storage_client.bucket(bucket_name).blob(object_name)
+        if size >= UPLOAD_RESUMABLE_THRESHOLD:
+            blob.chunk_size = UPLOAD_CHUNK_BYTES
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                blob.upload_from_file(f, size=size, content_type=content_type)
+        else:
+            # BytesIO over immutable bytes shares the buffer, so no per-bucket copy
+            blob.upload_from_file(io.BytesIO(source), size=size, content_type=content_type)
+
+    workers = max(1, min(UPLOAD_CONCURRENCY, len(bucket_names)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload") as pool:
+        futures = [pool.submit(_upload, bucket_name) for bucket_name in bucket_names]
+
+    results = []
+    for bucket_name, future in zip(bucket_names, futures):
+        exc = future.exception()
+        if exc:
+            print(f"Upload of {object_name} to {bucket_name} failed: {exc}")
+        results.append({
+            "bucket": bucket_name,
+            "object": object_name,
+            "error": str(exc) if exc else None,
+        })
+    return results
+
+
+def resolve_table_route(object_name):
+    """Longest INGEST_TABLE_ROUTES prefix matching ``object_name`` as a dict, or None."""
+    matches = [p for p in INGEST_TABLE_ROUTES if object_name.startswith(p)]
+    if not matches:
+        return None
+    prefix = max(matches, key=len)
+    return _table_route(prefix, INGEST_TABLE_ROUTES[prefix])
+
+
+def _table_route(prefix, route):
+    """One INGEST_TABLE_ROUTES entry with its defaults filled in; raises ValueError."""
+    import re
+    route = {"table": route} if isinstance(route, str) else dict(route)
+    route.setdefault("table", re.sub(r'[^a-zA-Z0-9_]', '_', prefix.strip("/")))
+    route.setdefault("mode", "append")
+    if route["mode"] not in ("append", "partition"):
+        raise ValueError(f"Unknown ingest mode {route['mode']!r} for prefix {prefix!r}")
+    route["partition_type"] = route.get("partition_type", "DAY").upper()
+    if route["partition_type"] not in ("HOUR", "DAY", "MONTH", "YEAR"):
+        raise ValueError(f"Unknown partition_type {route['partition_type']!r} for prefix {prefix!r}")
+    # Object paths name a date, not an hour, so HOUR partitions can't be replaced by path
+    if route["mode"] == "partition" and route["partition_type"] == "HOUR":
+        raise ValueError(f"Mode 'partition' supports DAY, MONTH or YEAR partitions, not HOUR (prefix {prefix!r})")
+    return route
+
+
+# Bad routes fail at startup rather than in every job routed to them
+for _prefix, _route in INGEST_TABLE_ROUTES.items():
+    _table_route(_prefix, _route)
+
+
+def default_table_name(object_name):
+    """Routed table for the object, else the sanitized object name without extension."""
+    import re
+    route = resolve_table_route(object_name)
+    if route:
+        return route["table"]
+    return re.sub(r'[^a-zA-Z0-9_]', '_', object_name.rsplit('.', 1)[0])
+
+
+def dataset_for_object(object_name, dataset=None):
+    """Explicit dataset, else the object's route dataset, else current_dataset, else BQ_DATASET."""
+    route = resolve_table_route(object_name)
+    return dataset or (route or {}).get("dataset") or current_dataset or BQ_DATASET
+
+
+_MONTH_NAMES = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+_MONTH_TEXT = "0[1-9]|1[0-2]|" + "|".join(
+    sorted(_MONTH_NAMES + ["january", "february", "march", "april", "june", "july", "august",
+                           "september", "sept", "october", "november", "december"], key=len, reverse=True))
+_PATH_DATES = {
+    "DAY": rf"(?<!\d)(20\d\d)[-/_]?({_MONTH_TEXT})[-/_]?(0[1-9]|[12]\d|3[01])(?![\d])",
+    "MONTH": rf"(?<!\d)(20\d\d)[-/_]?({_MONTH_TEXT})(?![a-z\d])",
+    "YEAR": r"(?<!\d)(20\d\d)(?!\d)",
+}
+
+
+def partition_for_object(object_name, partition_type="DAY"):
+    """Partition decorator (YYYYMMDD, YYYYMM or YYYY for DAY, MONTH or YEAR)
+    named by the first date in the object path with that precision, e.g.
+    ``2026/01/15``, ``2026-01`` or ``2026/jan`` for MONTH, ``2026`` for YEAR.
+
+    Raises ValueError when the path names no such date: the load replaces the
+    partition, so guessing one would wipe data already in it.
+    """
+    import re
+    precisions = ["DAY", "MONTH", "YEAR"]
+    # A finer date also names the coarser partition (2026-01-15 -> 202601)
+    for precision in precisions[:precisions.index(partition_type) + 1]:
+        match = re.search(_PATH_DATES[precision], object_name, re.I)
+        if match:
+            parts = list(match.groups())
+            if len(parts) > 1 and not parts[1].isdigit():
+                parts[1] = f"{_MONTH_NAMES.index(parts[1][:3].lower()) + 1:02d}"
+            return "".join(parts)[:{"DAY": 8, "MONTH": 6, "YEAR": 4}[partition_type]]
+    raise ValueError(f"The path of {object_name!r} has no date to name its {partition_type} partition")
+
+
+def load_to_bigquery(data, source_bucket, source_object, dataset=None, table_name=None, version_key=None):
+    """Load CSV/Excel data to BigQuery and log metadata to ingestion_log table.
+
+    ``data`` is a DataFrame, an iterable of DataFrame chunks, or a pyarrow
+    Table/RecordBatchReader. Arrow data is spooled to Parquet and loaded with an
+    explicit schema; multi-chunk DataFrame loads go through a staging table so
+    the destination is replaced atomically. ``table_name`` overrides the table
+    derived from the object name. Objects under an INGEST_TABLE_ROUTES prefix
+    are appended (or replace one partition) instead; see _load_incremental(),
+    which uses ``version_key`` (object_version_key()) to append each object
+    version only once. Tables with an INGEST_CONTRACTS entry are checked by validate_batches()
+    first, and rejected rows are uploaded as a dead-letter object after the load.
+    """
     global current_dataset
-    
-    # Use current_dataset if set, otherwise use BQ_DATASET
-    dataset = current_dataset or BQ_DATASET
+
+    route = resolve_table_route(source_object)
+
+    dataset = dataset_for_object(source_object, dataset)
     
     if not (PROJECT_ID and dataset and bq_client):
         raise RuntimeError("BigQuery is not configured. Set PROJECT_ID, BQ_DATASET.")
 
     # Create table name from object name (sanitize: remove extension, replace invalid chars)
-    import re
-    table_name = re.sub(r'[^a-zA-Z0-9_]', '_', source_object.rsplit('.', 1)[0])
+    table_name = table_name or default_table_name(source_object)
     data_table_id = f"{PROJECT_ID}.{dataset}.{table_name}"
     
-    # Load actual CSV/Excel data to dynamically named table
-    job_config = bigquery.LoadJobConfig(
-        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,  # Overwrite if exists
-        autodetect=True,  # Auto-detect schema
-    )
-    job = bq_client.load_table_from_dataframe(df, data_table_id, job_config=job_config)
-    job.result()  # wait for load
-    rows_loaded = len(df)
-    
-    # Log metadata to ingestion_log table
-    # Only include fields that exist in the original schema (backward compatible)
-    log_table_id = f"{PROJECT_ID}.{dataset}.ingestion_log"
-    log_df = pd.DataFrame([{
+    if isinstance(data, pa.Table):
+        data = data.to_reader()
+
+    # Contracted tables get an explicit, checked schema instead of autodetect
+    contract = contract_for_table(table_name)
+    dead_letter = None
+    if (route or contract) and not isinstance(data, pa.RecordBatchReader):
+        data = _dataframe_batches(iter([data]) if isinstance(data, pd.DataFrame) else iter(data),
+                                  contract["columns"] if contract else ())
+        if data is None:
+            raise ValueError(f"No data parsed from {source_object}")
+    if contract:
+        dead_letter = DeadLetterWriter(source_bucket, source_object)
+        data = validate_batches(data, contract, dead_letter)
+
+    try:
+        if route:
+            rows_loaded = _load_incremental(data, data_table_id, route, source_object, version_key)
+        elif isinstance(data, pa.RecordBatchReader):
+            rows_loaded = _load_arrow_via_parquet(data, data_table_id)
+        else:
+            chunks = iter([data]) if isinstance(data, pd.DataFrame) else iter(data)
+            with stage("parse"):
+                first = next(chunks, None)
+                if first is None:
+                    raise ValueError(f"No data parsed from {source_object}")
+                second = next(chunks, None)
+
+            if second is None:
+                # Single chunk: load actual CSV/Excel data to dynamically named table
+                job_config = bigquery.LoadJobConfig(
+                    write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,  # Overwrite if exists
+                    autodetect=True,  # Auto-detect schema
+                )
+                with stage("load"):
+                    job = bq_client.load_table_from_dataframe(first, data_table_id, job_config=job_config)
+                    job.result()  # wait for load
+                rows_loaded = len(first)
+            else:
+                rows_loaded = _load_chunks_via_staging(itertools.chain([first, second], chunks), data_table_id)
+
+        if dead_letter and dead_letter.rows:
+            uri = dead_letter.upload()
+            INGEST_REJECTED_ROWS.inc(dead_letter.rows)
+            print(f"Rejected {dead_letter.rows} rows of {source_object} under the {table_name} contract: {uri}")
+    finally:
+        if dead_letter:
+            dead_letter.close()
+
+    log_ingest(source_bucket, source_object, dataset, table_name, rows_loaded)
+    return rows_loaded
+
+
+def log_ingest(source_bucket, source_object, dataset, table_name, rows_loaded):
+    """Record a successful load in ingestion_log (buffered) and the local history."""
+    record = {
         "bucket": source_bucket,
         "object_name": source_object,
+        "bq_dataset": dataset,
+        "bq_table": table_name,
         "rows_loaded": rows_loaded,
         "status": "OK",
-        "timestamp": pd.Timestamp.utcnow()
-    }])
-    log_job = bq_client.load_table_from_dataframe(log_df, log_table_id)
-    log_job.result()
-    
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+    }
+    ingestion_log.add(f"{PROJECT_ID}.{dataset}.ingestion_log", record)
+    ingest_history.add(record)
+
+
+def _load_chunks_via_staging(chunks, data_table_id):
+    """Append chunks to a staging table, then swap it over the destination.
+
+    Only one chunk is held in memory at a time. The schema autodetected for the
+    first chunk is pinned for the rest so chunk-level inference cannot drift.
+    The staging table is created with an expiry first, so it is dropped even
+    if the process dies before the ``finally`` below.
+    """
+    staging_table_id, expires = _create_staging_table(data_table_id)
+    rows_loaded = 0
+    schema = None
+    try:
+        while True:
+            with stage("parse"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            job_config = bigquery.LoadJobConfig(
+                write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+                autodetect=schema is None,
+                schema=schema,
+            )
+            with stage("load"):
+                job = bq_client.load_table_from_dataframe(chunk, staging_table_id, job_config=job_config)
+                job.result()
+            rows_loaded += len(chunk)
+            if schema is None:
+                schema = bq_client.get_table(staging_table_id).schema
+
+        _replace_with_staging(staging_table_id, data_table_id, expires)
+    finally:
+        bq_client.delete_table(staging_table_id, not_found_ok=True)
     return rows_loaded
 
 
-def ingest_gcs_object(bucket_name, object_name):
-    if not storage_client:
-        raise RuntimeError("Storage client not configured. Set PROJECT_ID.")
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(object_name)
-    data = blob.download_as_bytes()
-    ext = object_name.lower()
-    buf = io.BytesIO(data)
+def _create_staging_table(data_table_id):
+    """Create an empty staging table next to ``data_table_id`` that expires on its own.
 
-    if ext.endswith(".csv"):
-        df = pd.read_csv(buf)
-    elif ext.endswith(".xls") or ext.endswith(".xlsx"):
-        df = pd.read_excel(buf)
-    else:
-        raise ValueError("Unsupported file type from GCS. Upload .csv or .xlsx")
+    Returns ``(staging_table_id, expires)``.
+    """
+    staging_table_id = f"{data_table_id}__staging_{uuid.uuid4().hex[:8]}"
+    staging = bigquery.Table(staging_table_id)
+    staging.expires = datetime.now(timezone.utc) + timedelta(hours=STAGING_TABLE_EXPIRATION_HOURS)
+    bq_client.create_table(staging)
+    return staging_table_id, staging.expires
 
-    rows_loaded = load_to_bigquery(df, bucket_name, object_name)
-    return rows_loaded, df.shape[1]
 
+def _replace_with_staging(staging_table_id, data_table_id, expires):
+    """Copy a filled staging table over ``data_table_id`` (the caller deletes it)."""
+    # Single copy job so readers see either the old table or the full new one
+    copy_config = bigquery.CopyJobConfig(
+        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+    )
+    with stage("load"):
+        bq_client.copy_table(staging_table_id, data_table_id, job_config=copy_config).result()
+        # Don't let a destination created by the copy inherit the staging expiry
+        table = bq_client.get_table(data_table_id)
+        if table.expires and table.expires == expires:
+            table.expires = None
+            bq_client.update_table(table, ["expires"])
 
-@app.route("/", methods=["GET", "POST"])
-def index():
-    global BQ_DATASET, current_dataset
-    
-    preview = None
-    message = None
-    
-    # Get list of buckets
-    buckets = []
-    if storage_client:
-        try:
-            buckets = [b.name for b in storage_client.list_buckets()]
-        except:
-            buckets = ["my-data-uploads"]  # fallback
-    
-    # Get list of BigQuery datasets
+
+def _dataframe_batches(chunks, text_columns=()):
+    """RecordBatchReader over DataFrame chunks, cast to the first chunk's types.
+
+    Object (mixed-type) columns named in ``text_columns`` are passed on as
+    strings for a contract to coerce, rather than failing the Arrow conversion.
+    """
+    def to_arrow(chunk):
+        text = {c: "string" for c in text_columns if c in chunk.columns and chunk[c].dtype == object}
+        return pa.Table.from_pandas(chunk.astype(text) if text else chunk, preserve_index=False)
+
+    with stage("parse"):
+        first = next(chunks, None)
+    if first is None:
+        return None
+    first = to_arrow(first)
+    schema = _loadable_arrow_schema(first.schema)
+
+    def batches():
+        table = first
+        while table is not None:
+            yield from table.cast(schema).to_batches()
+            chunk = next(chunks, None)
+            table = None if chunk is None else to_arrow(chunk)
+
+    return pa.RecordBatchReader.from_batches(schema, batches())
+
+
+@functools.lru_cache(maxsize=None)
+def bq_to_arrow_types():
+    """BigQuery column type -> Arrow type that loads into it from Parquet."""
+    return {
+        "STRING": pa.string(),
+        "INTEGER": pa.int64(), "INT64": pa.int64(),
+        "FLOAT": pa.float64(), "FLOAT64": pa.float64(),
+        "BOOLEAN": pa.bool_(), "BOOL": pa.bool_(),
+        "DATE": pa.date32(),
+        "DATETIME": pa.timestamp("us"),
+        "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+        "TIME": pa.time64("us"),
+        "NUMERIC": pa.decimal128(38, 9),
+        "BYTES": pa.binary(),
+    }
+
+
+def conform_to_table(batches, table_schema):
+    """Align Arrow batches with an existing table for an append.
+
+    Columns the table already has are cast to its types (a value that doesn't
+    fit raises ArrowInvalid), columns it lacks are kept as new NULLABLE fields,
+    and table columns missing from the data are filled with nulls. Returns
+    ``(reader, bq_schema)``.
+    """
+    incoming = _loadable_arrow_schema(batches.schema)
+    existing = {f.name: f for f in table_schema}
+    fields, bq_schema = [], []
+    for f in table_schema:
+        arrow_type = bq_to_arrow_types().get(f.field_type)
+        if arrow_type is None:
+            # Nested/unsupported types can't be conformed here; keep what the data has
+            arrow_type = incoming.field(f.name).type if f.name in incoming.names else pa.string()
+        fields.append(pa.field(f.name, arrow_type))
+        bq_schema.append(f)
+    new = pa.schema([f for f in incoming if f.name not in existing])
+    fields.extend(new)
+    bq_schema.extend(bigquery.SchemaField(f.name, f.field_type, mode="NULLABLE")
+                     for f in bq_schema_from_arrow(new))
+    schema = pa.schema(fields)
+
+    def conformed():
+        for batch in batches:
+            columns = []
+            for field in schema:
+                if field.name in batch.schema.names:
+                    column = batch.column(field.name)
+                    columns.append(column if column.type == field.type else column.cast(field.type))
+                else:
+                    columns.append(pa.nulls(batch.num_rows, field.type))
+            yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+    return pa.RecordBatchReader.from_batches(schema, conformed()), bq_schema
+
+
+def contract_for_table(table_name):
+    """INGEST_CONTRACTS entry for a table with column specs filled in, or None."""
+    contract = INGEST_CONTRACTS.get(table_name)
+    if not contract:
+        return None
+    columns = {}
+    for name, spec in contract.get("columns", {}).items():
+        spec = {"type": spec} if isinstance(spec, str) else dict(spec)
+        spec["type"] = spec.get("type", "STRING").upper()
+        if spec["type"] not in bq_to_arrow_types():
+            raise ValueError(f"Unsupported contract type {spec['type']!r} for {table_name}.{name}")
+        spec.setdefault("nullable", True)
+        columns[name] = spec
+    return {"columns": columns, "max_invalid_ratio": contract.get("max_invalid_ratio")}
+
+
+# Text a value must match before it is cast to the column type; anything else
+# is a rejected value rather than a cast error for the whole batch
+_DATE_TEXT = r"\d{4}-\d{2}-\d{2}"
+_TIME_TEXT = r"\d{2}:\d{2}(:\d{2}(\.\d{1,9})?)?"
+_ZONED_TEXT = rf"[T ]{_TIME_TEXT}(Z|[+-]\d{{2}}(:?\d{{2}})?)$"
+_TEXT_PATTERNS = {
+    "integer": r"^[-+]?\d+$",
+    "floating": r"^[-+]?((\d+\.?\d*|\.\d+)([eE][-+]?\d+)?|(?i:inf|infinity|nan))$",
+    "decimal": r"^[-+]?(\d+\.?\d*|\.\d+)$",
+    "date": rf"^{_DATE_TEXT}$",
+    "timestamp": rf"^{_DATE_TEXT}([T ]{_TIME_TEXT})?$",
+    "time": rf"^{_TIME_TEXT}$",
+}
+_TRUE_TEXT = ["true", "t", "yes", "y", "1"]
+_FALSE_TEXT = ["false", "f", "no", "n", "0"]
+
+
+def _cast_value(value, arrow_type):
+    try:
+        return pa.array([value]).cast(arrow_type)[0].as_py()
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return None
+
+
+def _cast_text(text, arrow_type):
+    """Cast a string array, turning values that don't parse into nulls."""
+    null = pa.scalar(None, pa.string())
+    if pa.types.is_boolean(arrow_type):
+        lowered = pc.utf8_lower(text)
+        return pc.if_else(pc.is_in(lowered, value_set=pa.array(_TRUE_TEXT)), True,
+                          pc.if_else(pc.is_in(lowered, value_set=pa.array(_FALSE_TEXT)), False,
+                                     pa.scalar(None, pa.bool_())))
+    if pa.types.is_timestamp(arrow_type) and arrow_type.tz:
+        # Values with an offset are converted to UTC; naive ones are taken as UTC
+        zoned = pc.fill_null(pc.match_substring_regex(text, _ZONED_TEXT), False)
+        naive = _cast_text(pc.if_else(zoned, null, text), pa.timestamp(arrow_type.unit))
+        aware = pc.if_else(pc.match_substring_regex(text, rf"^{_DATE_TEXT}{_ZONED_TEXT}"), text, null)
+        try:
+            aware = pc.cast(aware, arrow_type)
+        except pa.ArrowInvalid:
+            aware = pa.array([_cast_value(v, arrow_type) for v in aware.to_pylist()], arrow_type)
+        return pc.if_else(zoned, aware, naive.cast(arrow_type))
+    kind = next((k for k in _TEXT_PATTERNS if getattr(pa.types, f"is_{k}")(arrow_type)), None)
+    if kind:
+        text = pc.if_else(pc.match_substring_regex(text, _TEXT_PATTERNS[kind]), text, null)
+    try:
+        return pc.cast(text, arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        # In-pattern values can still be out of range (2026-02-30, 2**64); go value by value
+        return pa.array([_cast_value(v, arrow_type) for v in text.to_pylist()], arrow_type)
+
+
+def coerce_column(column, arrow_type):
+    """Coerce an Arrow array to ``arrow_type``; returns ``(values, failed)``.
+
+    A column that parses cleanly costs one vectorized cast, the common case.
+    Otherwise it is cast as trimmed text, blanks as nulls, with values that
+    don't parse set to null and flagged in the ``failed`` mask (None when
+    nothing failed).
+    """
+    if column.type == arrow_type:
+        return column, None
+    try:
+        return pc.cast(column, arrow_type), None
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        pass
+    text = column if pa.types.is_string(column.type) else pc.cast(column, pa.string())
+    text = pc.ascii_trim_whitespace(text)
+    text = pc.if_else(pc.equal(text, ""), pa.scalar(None, pa.string()), text)
+    values = _cast_text(text, arrow_type)
+    return values, pc.and_(pc.is_valid(text), pc.is_null(values))
+
+
+@functools.lru_cache(maxsize=1024)
+def _contract_value(value, arrow_type):
+    """A min/max bound as a scalar comparable with the column."""
+    return pa.array([value]).cast(arrow_type)[0] if isinstance(value, str) else pa.scalar(value)
+
+
+@functools.lru_cache(maxsize=256)
+def _contract_values(values, arrow_type):
+    return pa.array(list(values)).cast(arrow_type)
+
+
+@functools.lru_cache(maxsize=256)
+def _literal_prefix(pattern):
+    """The text a ``^literal`` pattern tests for, or None if it needs a regex."""
+    import re
+    prefix = pattern[1:] if pattern.startswith("^") else ""
+    return prefix if prefix and re.escape(prefix) == prefix else None
+
+
+def apply_contract(batch, contract, schema):
+    """Coerce one batch to ``schema`` and check it against ``contract``.
+
+    Returns ``(valid, rejected, reasons)``: the coerced batch without the
+    offending rows, their positions in ``batch`` (None if there are none), and
+    for each of them the list of checks it failed. Row masks are only built for
+    checks the column's null count, min/max or pattern matches say can fail.
+    """
+    columns, checks = [], []
+    for field in schema:
+        if field.name in batch.schema.names:
+            column = batch.column(field.name)
+        else:
+            column = pa.nulls(batch.num_rows, field.type)
+        spec = contract["columns"].get(field.name)
+        if spec is None:
+            columns.append(column if column.type == field.type else column.cast(field.type))
+            continue
+        values, failed = coerce_column(column, field.type)
+        columns.append(values)
+        name = field.name
+        if failed is not None:
+            checks.append((f"{name}: not a valid {spec['type']}", failed))
+        if not spec["nullable"] and values.null_count:
+            missing = pc.is_null(values)
+            checks.append((f"{name}: missing", missing if failed is None else pc.and_not(missing, failed)))
+        low, high = spec.get("min"), spec.get("max")
+        if (low is not None or high is not None) and values.null_count < len(values):
+            bounds = pc.min_max(values)
+            if low is not None:
+                low = _contract_value(low, field.type)
+                if bounds["min"].as_py() < low.as_py():
+                    checks.append((f"{name}: below {spec['min']}", pc.less(values, low)))
+            if high is not None:
+                high = _contract_value(high, field.type)
+                if bounds["max"].as_py() > high.as_py():
+                    checks.append((f"{name}: above {spec['max']}", pc.greater(values, high)))
+        if spec.get("allowed") is not None:
+            allowed = _contract_values(tuple(spec["allowed"]), field.type)
+            checks.append((f"{name}: not one of {spec['allowed']}",
+                           pc.and_(pc.is_valid(values), pc.invert(pc.is_in(values, value_set=allowed)))))
+        if spec.get("pattern"):
+            text = values if pa.types.is_string(values.type) else pc.cast(values, pa.string())
+            prefix = _literal_prefix(spec["pattern"])
+            if prefix is not None:
+                matched = pc.starts_with(text, pattern=prefix)
+            else:
+                matched = pc.match_substring_regex(text, spec["pattern"])
+            if matched.true_count < len(matched) - matched.null_count:
+                checks.append((f"{name}: does not match {spec['pattern']!r}", pc.invert(matched)))
+
+    coerced = pa.RecordBatch.from_arrays(columns, schema=schema)
+    if not checks:
+        return coerced, None, []
+    masks = [pc.fill_null(mask, False) for _, mask in checks]
+    bad = functools.reduce(pc.or_, masks)
+    if not pc.any(bad).as_py():
+        return coerced, None, []
+    rejected = pc.indices_nonzero(bad)
+    reasons = [[] for _ in range(len(rejected))]
+    for (reason, _), mask in zip(checks, masks):
+        for i, hit in enumerate(pc.take(mask, rejected).to_pylist()):
+            if hit:
+                reasons[i].append(reason)
+    return coerced.filter(pc.invert(bad)), rejected, reasons
+
+
+# Contract types the CSV parser converts as coerce_column() would; the others
+# are always read as text
+_CSV_PARSED_TYPES = {"STRING", "INTEGER", "INT64", "FLOAT", "FLOAT64", "NUMERIC", "DATE"}
+
+
+def contract_csv_types(contract, typed=True):
+    """Column types to pin when reading a CSV for a contracted table.
+
+    With ``typed`` the parser converts the columns it can, so a clean file
+    needs no casts in validate_batches(); a value it can't convert fails the
+    read with ArrowInvalid, and the spooled object is parsed again with
+    ``typed=False`` (contract columns as text) to be coerced and dead-lettered
+    row by row.
+    """
+    arrow_types = bq_to_arrow_types()
+    return {
+        name: arrow_types[spec["type"]] if typed and spec["type"] in _CSV_PARSED_TYPES else pa.string()
+        for name, spec in contract["columns"].items()
+    }
+
+
+def validate_batches(batches, contract, dead_letter):
+    """Apply a column contract to a RecordBatchReader between parse and load.
+
+    Contract columns are coerced to their BigQuery types and checked with
+    vectorized compute kernels, batch by batch; other columns pass through as
+    parsed, and nullable contract columns missing from the data are added as
+    nulls. Rejected rows, as parsed, go to ``dead_letter``. Raises ValueError
+    up front if a required column is missing, and once the data is exhausted
+    if more than ``max_invalid_ratio`` of the rows were rejected.
+    """
+    arrow_types = bq_to_arrow_types()
+    incoming = _loadable_arrow_schema(batches.schema)
+    fields = [
+        pa.field(f.name, arrow_types[contract["columns"][f.name]["type"]])
+        if f.name in contract["columns"] else f
+        for f in incoming
+    ]
+    for name, spec in contract["columns"].items():
+        if name not in incoming.names:
+            if not spec["nullable"]:
+                raise ValueError(f"Required column {name!r} is missing from {dead_letter.source_object}")
+            fields.append(pa.field(name, arrow_types[spec["type"]]))
+    schema = pa.schema(fields)
+
+    def validated():
+        total = 0
+        for batch in batches:
+            with stage("validate"):
+                valid, rejected, reasons = apply_contract(batch, contract, schema)
+                if rejected is not None:
+                    dead_letter.write(batch.take(rejected).to_pylist(), reasons)
+            total += batch.num_rows
+            if valid.num_rows:
+                yield valid
+        limit = contract["max_invalid_ratio"]
+        if limit is not None and dead_letter.rows > limit * total:
+            raise ValueError(f"{dead_letter.rows} of {total} rows in {dead_letter.source_object} "
+                             f"break the contract (max_invalid_ratio {limit})")
+
+    return pa.RecordBatchReader.from_batches(schema, validated())
+
+
+class DeadLetterWriter:
+    """Spools rows rejected by a column contract and uploads them as one object.
+
+    Rows are written as NDJSON, each with an ``_errors`` list, to a local temp
+    file; upload() puts it at ``<DEAD_LETTER_PREFIX><object>.<UTC time>.jsonl``
+    in DEAD_LETTER_BUCKET or the source bucket.
+    """
+
+    def __init__(self, source_bucket, source_object):
+        self.source_bucket = source_bucket
+        self.source_object = source_object
+        self.rows = 0
+        self._spool = None
+
+    def write(self, rows, reasons):
+        if self._spool is None:
+            self._spool = tempfile.NamedTemporaryFile("w", suffix=".jsonl", dir=INGEST_SPOOL_DIR)
+        for row, errors in zip(rows, reasons):
+            row["_errors"] = errors
+            self._spool.write(json.dumps(row, default=str) + "\n")
+        self.rows += len(rows)
+
+    def upload(self):
+        """Upload the spooled rows; returns their gs:// URI, or None if there are none."""
+        if not self.rows:
+            return None
+        bucket_name = DEAD_LETTER_BUCKET or self.source_bucket
+        name = f"{DEAD_LETTER_PREFIX}{self.source_object}.{datetime.utcnow():%Y%m%dT%H%M%SZ}.jsonl"
+        self._spool.flush()
+        with stage("dead_letter"):
+            storage_client.bucket(bucket_name).blob(name).upload_from_filename(
+                self._spool.name, content_type="application/x-ndjson")
+        return f"gs://{bucket_name}/{name}"
+
+    def close(self):
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+
+def _append_job_prefix(data_table_id, version_key):
+    """Load job id prefix shared by every append of one object version to one table."""
+    import hashlib
+    return "ingest_append_" + hashlib.sha256(f"{data_table_id}|{version_key}".encode()).hexdigest()[:40]
+
+
+def _completed_append(job_prefix):
+    """``(next_job_id, done_job)`` for the append jobs under ``job_prefix``.
+
+    Attempts are numbered; a failed attempt is passed over, one still running
+    (another instance loading the same object) is waited for, and the first
+    that succeeded is returned as ``done_job``.
+    """
+    from google.api_core.exceptions import GoogleAPICallError, NotFound
+    for attempt in itertools.count():
+        job_id = f"{job_prefix}_{attempt}"
+        try:
+            job = bq_client.get_job(job_id)
+        except NotFound:
+            return job_id, None
+        try:
+            job.result()
+        except GoogleAPICallError:
+            continue
+        return job_id, job
+
+
+def _load_incremental(batches, data_table_id, route, source_object, version_key=None):
+    """Append one object to a routed table, or replace its partition.
+
+    Only the object's own rows are sent. An existing table keeps its column
+    types and gains any new columns as NULLABLE (ALLOW_FIELD_ADDITION); a new
+    table is created partitioned by ``partition_field`` (or by ingestion time
+    in "partition" mode).
+
+    Appends run as load jobs with ids derived from the table and
+    ``version_key``. BigQuery keeps job ids unique per project, so a
+    redelivery, a backfill or a CLI run on any instance finds the earlier job
+    and skips the object instead of appending its rows again.
+    """
+    from google.api_core.exceptions import Conflict, NotFound
+    job_id = None
+    if route["mode"] == "append":
+        if version_key:
+            job_id, done = _completed_append(_append_job_prefix(data_table_id, version_key))
+            if done:
+                print(f"{version_key} was already appended to {data_table_id} by job {done.job_id}; skipping")
+                return done.output_rows or 0
+        else:
+            print(f"WARNING: no version key for {source_object}; appending to {data_table_id} without a duplicate check")
+    try:
+        table_schema = bq_client.get_table(data_table_id).schema
+    except NotFound:
+        table_schema = None
+    if table_schema:
+        batches, bq_schema = conform_to_table(batches, table_schema)
+    else:
+        bq_schema = None
+
+    partition_type = route["partition_type"]
+    time_partitioning = None
+    if route.get("partition_field"):
+        time_partitioning = bigquery.TimePartitioning(type_=partition_type, field=route["partition_field"])
+    elif route["mode"] == "partition":
+        time_partitioning = bigquery.TimePartitioning(type_=partition_type)
+
+    destination = data_table_id
+    disposition = bigquery.WriteDisposition.WRITE_APPEND
+    if route["mode"] == "partition":
+        destination = f"{data_table_id}${partition_for_object(source_object, partition_type)}"
+        disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
+
+    with tempfile.NamedTemporaryFile(suffix=".parquet", dir=INGEST_SPOOL_DIR) as spool:
+        with stage("parse"):
+            rows_loaded, arrow_schema = write_parquet_spool(batches, spool.name)
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            write_disposition=disposition,
+            schema=bq_schema or bq_schema_from_arrow(arrow_schema),
+            # Partitioning is fixed when the first load creates the table
+            time_partitioning=None if table_schema else time_partitioning,
+            schema_update_options=[bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION] if table_schema else None,
+        )
+        spool.seek(0)
+        with stage("load"):
+            try:
+                job = bq_client.load_table_from_file(spool, destination, job_config=job_config, job_id=job_id)
+            except Conflict:
+                # Another instance started the same append since the check above
+                job = bq_client.get_job(job_id)
+                print(f"{version_key} is being appended to {data_table_id} by job {job_id}; waiting for it")
+                job.result()
+                return job.output_rows or 0
+            job.result()
+    return rows_loaded
+
+
+def bq_schema_from_arrow(schema):
+    """Map an Arrow schema to BigQuery SchemaFields (unknown types load as STRING)."""
+    fields = []
+    for field in schema:
+        t = field.type
+        if pa.types.is_boolean(t):
+            bq_type = "BOOLEAN"
+        elif pa.types.is_integer(t):
+            bq_type = "INTEGER"
+        elif pa.types.is_floating(t):
+            bq_type = "FLOAT"
+        elif pa.types.is_decimal(t):
+            bq_type = "NUMERIC" if t.precision <= 38 and t.scale <= 9 else "BIGNUMERIC"
+        elif pa.types.is_timestamp(t):
+            bq_type = "TIMESTAMP" if t.tz else "DATETIME"
+        elif pa.types.is_date(t):
+            bq_type = "DATE"
+        elif pa.types.is_time(t):
+            bq_type = "TIME"
+        elif pa.types.is_binary(t) or pa.types.is_large_binary(t):
+            bq_type = "BYTES"
+        else:
+            bq_type = "STRING"
+        fields.append(bigquery.SchemaField(field.name, bq_type))
+    return fields
+
+
+def _loadable_arrow_schema(schema):
+    """All-null columns have no Parquet/BigQuery type; store them as strings."""
+    return pa.schema([
+        pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+        for f in schema
+    ])
+
+
+def write_parquet_spool(batches, path, max_bytes=None):
+    """Write a RecordBatchReader to a Parquet file one batch at a time.
+
+    With ``max_bytes``, stops after the batch that takes the file past that
+    size and leaves the rest of ``batches`` unread.
+    Returns ``(rows_written, arrow_schema)``.
+    """
+    schema = _loadable_arrow_schema(batches.schema)
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            if batch.schema != schema:
+                batch = batch.cast(schema)
+            writer.write_batch(batch)
+            rows += batch.num_rows
+            if max_bytes and os.path.getsize(path) >= max_bytes:
+                break
+    return rows, schema
+
+
+def _load_arrow_via_parquet(batches, data_table_id):
+    """Spool Arrow batches to local Parquet files and load them.
+
+    The spool is rolled every INGEST_SPOOL_PART_BYTES so only one part sits on
+    local disk (RAM on Cloud Run) at a time. A single part is loaded straight
+    over the table; more are appended to a staging table that one copy job
+    then puts in place, as _load_chunks_via_staging() does.
+    """
+    source_schema = batches.schema
+    schema = _loadable_arrow_schema(source_schema)
+    pending = iter(batches)
+    staging_table_id = expires = None
+    rows_loaded = 0
+    try:
+        while True:
+            with tempfile.NamedTemporaryFile(suffix=".parquet", dir=INGEST_SPOOL_DIR) as spool:
+                with stage("parse"):
+                    rows, _ = write_parquet_spool(
+                        pa.RecordBatchReader.from_batches(source_schema, pending), spool.name,
+                        INGEST_SPOOL_PART_BYTES)
+                    following = next(pending, None)
+                if following is not None and staging_table_id is None:
+                    staging_table_id, expires = _create_staging_table(data_table_id)
+                job_config = bigquery.LoadJobConfig(
+                    source_format=bigquery.SourceFormat.PARQUET,
+                    write_disposition=(bigquery.WriteDisposition.WRITE_APPEND if staging_table_id
+                                       else bigquery.WriteDisposition.WRITE_TRUNCATE),
+                    schema=bq_schema_from_arrow(schema),
+                )
+                spool.seek(0)
+                with stage("load"):
+                    job = bq_client.load_table_from_file(
+                        spool, staging_table_id or data_table_id, job_config=job_config)
+                    job.result()
+            rows_loaded += rows
+            if following is None:
+                break
+            pending = itertools.chain([following], pending)
+
+        if staging_table_id:
+            _replace_with_staging(staging_table_id, data_table_id, expires)
+    finally:
+        if staging_table_id:
+            bq_client.delete_table(staging_table_id, not_found_ok=True)
+    return rows_loaded
+
+
+def infer_csv_column_types(fileobj):
+    """Infer Arrow column types from the first ARROW_CSV_INFER_BYTES of a CSV.
+
+    Reads the head sample and seeks back to the start. All-null sample columns
+    are typed as strings. Returns None if the stream can't be rewound or the
+    sample can't be parsed, leaving inference to the reader.
+    """
+    if not fileobj.seekable():
+        return None
+    head = fileobj.read(ARROW_CSV_INFER_BYTES)
+    fileobj.seek(0)
+    if len(head) == ARROW_CSV_INFER_BYTES:
+        head = head[:head.rfind(b"\n") + 1]  # drop the partial last record
+    return _column_types_from_sample(head)
+
+
+def _column_types_from_sample(head, parse_options=None):
+    try:
+        schema = pa_csv.read_csv(io.BytesIO(head), parse_options=parse_options).schema
+    except pa.ArrowInvalid:
+        return None
+    return {f.name: pa.string() if pa.types.is_null(f.type) else f.type for f in schema}
+
+
+def open_arrow_csv(fileobj, pinned_types=None):
+    """Open a streaming Arrow CSV reader with a stable, sample-inferred schema.
+
+    ``pinned_types`` override the sample for some columns (see
+    contract_csv_types()); blank and NA-like cells then parse as nulls in
+    every string column, as they do with pandas.
+    """
+    column_types = infer_csv_column_types(fileobj) or {}
+    column_types.update(pinned_types or {})
+    return pa_csv.open_csv(
+        fileobj,
+        read_options=pa_csv.ReadOptions(block_size=ARROW_CSV_BLOCK_BYTES),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types or None, strings_can_be_null=bool(pinned_types)),
+    )
+
+
+def _count_quotes(buf, start, end, step=8 * 1024 * 1024):
+    return sum(buf[i:min(i + step, end)].count(b'"') for i in range(start, end, step))
+
+
+def next_record_start(buf, pos, in_quotes=False):
+    """Offset just past the first newline at or after ``pos`` that is outside quotes.
+
+    ``in_quotes`` is the quote state at ``pos``. Returns ``len(buf)`` if there is
+    no further record boundary.
+    """
+    while True:
+        newline = buf.find(b"\n", pos)
+        if newline < 0:
+            return len(buf)
+        if _count_quotes(buf, pos, newline) % 2:
+            in_quotes = not in_quotes
+        if not in_quotes:
+            return newline + 1
+        pos = newline + 1
+
+
+def split_csv_ranges(buf, data_start, parts):
+    """Split ``buf[data_start:]`` into up to ``parts`` byte ranges on record boundaries.
+
+    Quote parity is carried from one boundary to the next, so newlines inside
+    quoted fields never start a range.
+    """
+    size = len(buf)
+    bounds = [data_start]
+    pos = data_start
+    in_quotes = False
+    for k in range(1, parts):
+        target = data_start + (size - data_start) * k // parts
+        if target <= bounds[-1]:
+            continue
+        if _count_quotes(buf, pos, target) % 2:
+            in_quotes = not in_quotes
+        start = next_record_start(buf, target, in_quotes)
+        if start >= size:
+            break
+        bounds.append(start)
+        pos, in_quotes = start, False
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _parse_csv_range(path, start, end, column_types, out_path, strings_can_be_null=False):
+    """Parse one byte range of a CSV into an Arrow IPC file; returns the row count.
+
+    Module-level so it can run in a process pool.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    table = pa_csv.read_csv(
+        pa.py_buffer(data),
+        read_options=pa_csv.ReadOptions(column_names=list(column_types), use_threads=False),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=strings_can_be_null),
+    )
+    with pa.OSFile(out_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return table.num_rows
+
+
+_parse_process_pool = None
+
+
+def _parse_executor(workers):
+    """Process pool for INGEST_PARSE_MODE=process, created on first use."""
+    global _parse_process_pool
+    with _ingest_process_pool_lock:
+        if _parse_process_pool is None:
+            import multiprocessing
+            _parse_process_pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _parse_process_pool
+
+
+def open_parallel_csv(path, workers, mode="threads", pinned_types=None):
+    """RecordBatchReader over a local CSV parsed as byte ranges in parallel.
+
+    Ranges start on record boundaries outside quotes, so quoted fields may span
+    lines. Types are inferred once from the head sample and pinned for every
+    range so the parts agree. Ranges are parsed by ``workers`` threads or
+    processes into temporary Arrow IPC files and yielded back in file order;
+    only ``workers`` ranges are in flight at once, so the parts on disk stay
+    bounded however large the file is. ``pinned_types`` are applied as in open_arrow_csv(). Returns None when the
+    head sample can't be parsed.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        data_start = next_record_start(buf, 0)
+        head_end = min(len(buf), ARROW_CSV_INFER_BYTES)
+        head_end = next_record_start(buf, head_end, _count_quotes(buf, 0, head_end) % 2 == 1)
+        column_types = _column_types_from_sample(
+            buf[:head_end], pa_csv.ParseOptions(newlines_in_values=True))
+        parts = max(workers, -(-(len(buf) - data_start) // INGEST_PARALLEL_RANGE_BYTES))
+        ranges = split_csv_ranges(buf, data_start, parts)
+    if not column_types:
+        return None
+    column_types.update((n, t) for n, t in (pinned_types or {}).items() if n in column_types)
+    schema = pa.schema(list(column_types.items()))
+
+    def batches():
+        parts_dir = tempfile.mkdtemp(prefix="csv-parts-", dir=INGEST_SPOOL_DIR)
+        executor = _parse_executor(workers) if mode == "process" else ThreadPoolExecutor(workers, "csv-parse")
+        pending = deque()
+        todo = iter(enumerate(ranges))
+
+        def submit_next():
+            for i, (start, end) in itertools.islice(todo, 1):
+                part_path = os.path.join(parts_dir, f"part-{i:05d}.arrow")
+                pending.append((part_path, executor.submit(
+                    _parse_csv_range, path, start, end, column_types, part_path, bool(pinned_types))))
+
+        try:
+            for _ in range(workers):
+                submit_next()
+            while pending:
+                part_path, future = pending.popleft()
+                future.result()
+                # Refill the window before reading the part back so the workers
+                # stay busy while it's consumed; at most workers + 1 parts exist.
+                submit_next()
+                with pa.memory_map(part_path) as source:
+                    reader = pa.ipc.open_file(source)
+                    for i in range(reader.num_record_batches):
+                        yield reader.get_batch(i)
+                os.remove(part_path)
+        finally:
+            for _, future in pending:
+                future.cancel()
+            if mode != "process":
+                executor.shutdown(wait=True)
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+    return pa.RecordBatchReader.from_batches(schema, batches())
+
+
+def ingest_csv_spooled(blob, bucket_name, object_name, dataset=None, attempts=(None,), version_key=None):
+    """Spool a CSV object locally once and load it with the Arrow reader.
+
+    Objects of at least INGEST_PARALLEL_MIN_BYTES go through open_parallel_csv()
+    when parallel parsing is on. ``attempts`` are the ``pinned_types`` to try
+    in turn, moving to the next when a value doesn't fit; each retry re-parses
+    the local copy rather than downloading the object again. Returns None if
+    every attempt fails.
+    """
+    workers = INGEST_PARSE_WORKERS or os.cpu_count() or 1
+    with tempfile.NamedTemporaryFile(suffix=".csv", dir=INGEST_SPOOL_DIR) as spool:
+        with stage("download"):
+            blob.download_to_file(spool)
+            spool.flush()
+        size = os.path.getsize(spool.name)
+        record_download(size)
+        for pinned_types in attempts:
+            try:
+                batches = None
+                if workers != 1 and size >= INGEST_PARALLEL_MIN_BYTES:
+                    batches = open_parallel_csv(spool.name, workers, INGEST_PARSE_MODE, pinned_types)
+                if batches is None:
+                    spool.seek(0)
+                    batches = open_arrow_csv(spool, pinned_types)
+                rows_loaded = load_to_bigquery(batches, bucket_name, object_name, dataset, version_key=version_key)
+                return rows_loaded, len(batches.schema)
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as exc:
+                print(f"Arrow parse failed for {object_name}, retrying: {exc}")
+    return None
+
+
+def _complete_records(head):
+    """``head`` cut after its last complete record (quoted newlines respected)."""
+    end = 0
+    while True:
+        start = next_record_start(head, end)
+        if start >= len(head):
+            return head[:end] if end else head
+        end = start
+
+
+def load_csv_from_uri(blob, bucket_name, object_name, dataset=None):
+    """Load a CSV object with a BigQuery job reading its gs:// URI directly.
+
+    Only the first INGEST_URI_SAMPLE_BYTES are downloaded: the header must be
+    valid, unique BigQuery column names and the sample must parse, and the
+    schema inferred from it is pinned on the load job. Returns ``(rows, cols)``,
+    or None when the object needs the in-process path (the sample doesn't
+    qualify, or BigQuery rejected the data; a failed load leaves the table as
+    it was).
+    """
+    import re
+    from google.api_core.exceptions import GoogleAPICallError
+
+    dataset = dataset_for_object(object_name, dataset)
+    if not (PROJECT_ID and dataset and bq_client):
+        raise RuntimeError("BigQuery is not configured. Set PROJECT_ID, BQ_DATASET.")
+
+    with stage("download"):
+        head = blob.download_as_bytes(start=0, end=INGEST_URI_SAMPLE_BYTES - 1)
+    record_download(len(head))
+    with stage("parse"):
+        if len(head) >= INGEST_URI_SAMPLE_BYTES:
+            head = _complete_records(head)
+        column_types = _column_types_from_sample(head, pa_csv.ParseOptions(newlines_in_values=True))
+    if not column_types:
+        return None
+    names = list(column_types)
+    if (len({n.lower() for n in names}) != len(names)
+            or not all(re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]{0,299}', n) for n in names)):
+        print(f"Header of {object_name} needs renaming, loading in-process")
+        return None
+
+    table_name = default_table_name(object_name)
+    job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.CSV,
+        skip_leading_rows=1,
+        allow_quoted_newlines=True,
+        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+        schema=bq_schema_from_arrow(pa.schema(list(column_types.items()))),
+    )
+    try:
+        with stage("load"):
+            job = bq_client.load_table_from_uri(
+                f"gs://{bucket_name}/{object_name}", f"{PROJECT_ID}.{dataset}.{table_name}", job_config=job_config)
+            job.result()
+    except GoogleAPICallError as exc:
+        print(f"URI load of gs://{bucket_name}/{object_name} failed, loading in-process: {exc}")
+        return None
+    rows_loaded = job.output_rows or 0
+    log_ingest(bucket_name, object_name, dataset, table_name, rows_loaded)
+    return rows_loaded, len(names)
+
+
+def iter_csv_chunks(fileobj, shape, text_columns=()):
+    """Yield DataFrame chunks of at most INGEST_CHUNK_ROWS rows from a CSV stream.
+
+    ``shape`` is a ``[rows, cols]`` list updated as chunks are produced;
+    ``text_columns`` are read as strings.
+    """
+    dtype = dict.fromkeys(text_columns, str) or None
+    for chunk in pd.read_csv(fileobj, chunksize=INGEST_CHUNK_ROWS, dtype=dtype):
+        shape[0] += len(chunk)
+        shape[1] = chunk.shape[1]
+        yield chunk
+
+
+def _excel_trimmed_width(row):
+    """Length of ``row`` without its trailing empty cells."""
+    width = len(row)
+    while width and row[width - 1] is None:
+        width -= 1
+    return width
+
+
+def _excel_column_names(header, width=None):
+    """Header cells to column names, matching pandas' Unnamed/.N conventions.
+
+    ``width`` pads or truncates the header to that many columns.
+    """
+    header = list(header) if width is None else (list(header) + [None] * width)[:width]
+    names = []
+    seen = {}
+    for i, value in enumerate(header):
+        name = str(value) if value is not None else f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _excel_rows_to_batch(rows, names, schema=None):
+    """Turn a list of row tuples into an Arrow RecordBatch, column by column."""
+    arrays = []
+    for i in range(len(names)):
+        array = pa.array([row[i] if i < len(row) else None for row in rows])
+        # Infer then safe-cast: converting Python floats straight to int64 truncates silently
+        if schema is not None and array.type != schema.field(i).type:
+            array = array.cast(schema.field(i).type)
+        arrays.append(array)
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def excel_sheet_reader(ws, batch_rows=None):
+    """Stream an openpyxl read-only worksheet as an Arrow RecordBatchReader.
+
+    The first row is the header and blank rows are skipped. Read-only sheets
+    pad every row to the stored dimension, so trailing empty cells are dropped
+    as pandas does: the sheet is as wide as the header or the first batch's
+    widest row. Column types are inferred from the first batch and enforced for
+    later ones (ArrowInvalid or ArrowTypeError if they don't fit, or if a later
+    row has values past the last column). Returns None for an empty sheet.
+    """
+    batch_rows = batch_rows or EXCEL_BATCH_ROWS
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return None
+
+    def row_batches():
+        batch = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            batch.append(row)
+            if len(batch) >= batch_rows:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    pending = row_batches()
+    first_rows = next(pending, [])
+    width = max([_excel_trimmed_width(header)] + [_excel_trimmed_width(row) for row in first_rows])
+    if not width:
+        return None
+    names = _excel_column_names(header, width)
+    first = _excel_rows_to_batch(first_rows, names)
+    schema = _loadable_arrow_schema(first.schema)
+    first = first.cast(schema)
+
+    def batches():
+        yield first
+        for batch in pending:
+            if any(_excel_trimmed_width(row) > width for row in batch):
+                raise pa.ArrowInvalid(f"Row has values past the {width} columns of the first batch")
+            yield _excel_rows_to_batch(batch, names, schema)
+
+    return pa.RecordBatchReader.from_batches(schema, batches())
+
+
+def ingest_excel_workbook(blob, bucket_name, object_name, dataset=None, version_key=None):
+    """Stream an .xlsx object into BigQuery sheet by sheet.
+
+    The workbook is spooled to a temp file (the zip container needs random
+    access) and read with openpyxl's read-only row iterator, so memory stays
+    bounded by EXCEL_BATCH_ROWS rather than the workbook size. A sheet whose
+    values don't fit its inferred column types is loaded through pandas.
+    """
+    import openpyxl
+    import re
+    base_table = default_table_name(object_name)
+    total_rows = 0
+    first_cols = 0
+    with tempfile.NamedTemporaryFile(suffix=".xlsx", dir=INGEST_SPOOL_DIR) as spool:
+        with stage("download"):
+            blob.download_to_file(spool)
+            spool.flush()
+        record_download(os.path.getsize(spool.name))
+        wb = openpyxl.load_workbook(spool.name, read_only=True, data_only=True)
+        try:
+            sheets = wb.worksheets if EXCEL_ALL_SHEETS else wb.worksheets[:1]
+            for index, ws in enumerate(sheets):
+                table_name = None
+                if EXCEL_ALL_SHEETS:
+                    table_name = f"{base_table}__{re.sub(r'[^a-zA-Z0-9_]', '_', ws.title)}"
+                try:
+                    reader = excel_sheet_reader(ws)
+                    if reader is None:
+                        continue
+                    rows = load_to_bigquery(reader, bucket_name, object_name, dataset, table_name, version_key)
+                    cols = len(reader.schema)
+                except (pa.ArrowInvalid, pa.ArrowTypeError) as exc:
+                    print(f"Streaming Excel parse failed for {object_name}[{ws.title}], loading via pandas: {exc}")
+                    with stage("parse"):
+                        df = pd.read_excel(spool.name, sheet_name=ws.title)
+                    rows = load_to_bigquery(df, bucket_name, object_name, dataset, table_name, version_key)
+                    cols = df.shape[1]
+                total_rows += rows
+                if index == 0:
+                    first_cols = cols
+        finally:
+            wb.close()
+    return total_rows, first_cols
+
+
+def ingest_gcs_object(bucket_name, object_name, dataset=None, version_key=None, size=None):
+    """Ingest one GCS object into BigQuery; returns ``(rows, cols)``.
+
+    ``version_key`` (object_version_key()) makes appends to routed tables
+    idempotent. ``size`` is the object's size in bytes when the caller knows it
+    (the notification carries it); otherwise it is read from the object's
+    metadata where the load path depends on it. Records per-stage timings, bytes, rows/columns and peak RSS in
+    the metrics.
+    """
+    trace = IngestTrace()
+    _trace_local.trace = trace
+    status = "error"
+    begin_ingest_rss()
+    start = time.perf_counter()
+    try:
+        rows, cols = _ingest_gcs_object(bucket_name, object_name, dataset, version_key, size)
+        status = "ok"
+        INGEST_ROWS.observe(rows)
+        INGEST_COLUMNS.observe(cols)
+        return rows, cols
+    finally:
+        _trace_local.trace = None
+        elapsed = time.perf_counter() - start
+        for name, seconds in trace.stages.items():
+            INGEST_STAGE_SECONDS.observe(seconds, stage=name)
+        INGEST_SECONDS.observe(elapsed, status=status)
+        INGESTS_TOTAL.inc(status=status)
+        INGEST_BYTES.inc(trace.bytes_downloaded)
+        peak = end_ingest_rss()
+        if peak:
+            INGEST_PEAK_RSS.observe(peak)
+        stages = " ".join(f"{k}={v:.3f}s" for k, v in sorted(trace.stages.items()))
+        print(f"Ingest {status} gs://{bucket_name}/{object_name} in {elapsed:.3f}s "
+              f"({stages}; {trace.bytes_downloaded} bytes; peak RSS {peak})")
+
+
+def _ingest_gcs_object(bucket_name, object_name, dataset=None, version_key=None, size=None):
+    if not storage_client:
+        raise RuntimeError("Storage client not configured. Set PROJECT_ID.")
+    bucket = storage_client.bucket(bucket_name)
+    blob = bucket.blob(object_name)
+    ext = object_name.lower()
+
+    if ext.endswith(".csv"):
+        contract = contract_for_table(default_table_name(object_name))
+        # Routed (append/partition) loads conform data to the table and contracts
+        # check every row, which both need the rows in-process
+        if INGEST_URI_LOAD_MIN_BYTES >= 0 and not resolve_table_route(object_name) and not contract:
+            if size is None:
+                blob.reload()  # metadata only, for the size
+                size = blob.size or 0
+            if size >= INGEST_URI_LOAD_MIN_BYTES:
+                result = load_csv_from_uri(blob, bucket_name, object_name, dataset)
+                if result:
+                    return result
+        result = None
+        if INGEST_ENGINE == "arrow" and contract:
+            # Contract columns are parsed to their types first, then as text if a
+            # value doesn't parse; the object is spooled so the retry stays local
+            result = ingest_csv_spooled(blob, bucket_name, object_name, dataset, [
+                contract_csv_types(contract), contract_csv_types(contract, typed=False)], version_key)
+        elif INGEST_ENGINE == "arrow":
+            if INGEST_PARSE_WORKERS != 1 and size is None:
+                blob.reload()
+                size = blob.size or 0
+            if INGEST_PARSE_WORKERS != 1 and size >= INGEST_PARALLEL_MIN_BYTES:
+                result = ingest_csv_spooled(blob, bucket_name, object_name, dataset, version_key=version_key)
+            else:
+                try:
+                    with blob.open("rb", chunk_size=GCS_READ_CHUNK_BYTES) as reader:
+                        batches = open_arrow_csv(CountingReader(reader))
+                        rows_loaded = load_to_bigquery(
+                            batches, bucket_name, object_name, dataset, version_key=version_key)
+                    result = rows_loaded, len(batches.schema)
+                except (pa.ArrowInvalid, pa.ArrowTypeError) as exc:
+                    print(f"Arrow parse failed for {object_name}, retrying: {exc}")
+        if result:
+            return result
+
+        # Pandas engine, or later blocks did not fit the inferred types (pandas is
+        # more forgiving). Ranged streaming reads + chunked parsing keep peak memory flat
+        shape = [0, 0]
+        with blob.open("rb", chunk_size=GCS_READ_CHUNK_BYTES) as reader:
+            chunks = iter_csv_chunks(CountingReader(reader), shape, list((contract or {}).get("columns", ())))
+            rows_loaded = load_to_bigquery(chunks, bucket_name, object_name, dataset, version_key=version_key)
+        return rows_loaded, shape[1]
+    elif ext.endswith(".xlsx") and INGEST_ENGINE == "arrow":
+        return ingest_excel_workbook(blob, bucket_name, object_name, dataset, version_key)
+    elif ext.endswith(".xls") or ext.endswith(".xlsx"):
+        with stage("download"):
+            data = blob.download_as_bytes()
+        record_download(len(data))
+        with stage("parse"):
+            df = pd.read_excel(io.BytesIO(data))
+    else:
+        raise ValueError("Unsupported file type from GCS. Upload .csv or .xlsx")
+
+    if INGEST_ENGINE == "arrow":
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as exc:
+            print(f"Arrow conversion failed for {object_name}, loading DataFrame: {exc}")
+        else:
+            return load_to_bigquery(table, bucket_name, object_name, dataset, version_key=version_key), df.shape[1]
+
+    rows_loaded = load_to_bigquery(df, bucket_name, object_name, dataset, version_key=version_key)
+    return rows_loaded, df.shape[1]
+
+
+class ProcessedIndex:
+    """Records which object versions were ingested, keyed by object_version_key().
+
+    This base class keeps everything in memory; subclasses persist it.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def seen(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def mark(self, key, bucket, name, rows):
+        with self._lock:
+            self._entries[key] = {"bucket": bucket, "name": name, "rows": rows, "skips": 0}
+
+    def record_skip(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries[key]["skips"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "processed": len(self._entries),
+                "skipped": sum(e["skips"] for e in self._entries.values()),
+            }
+
+
+class NullProcessedIndex(ProcessedIndex):
+    """Never reports an object as seen (deduplication disabled)."""
+
+    def seen(self, key):
+        return False
+
+    def mark(self, key, bucket, name, rows):
+        pass
+
+
+class SQLiteProcessedIndex(ProcessedIndex):
+    """Processed-object index persisted in a local SQLite file."""
+
+    def __init__(self, path):
+        super().__init__()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS processed_objects (
+                    key TEXT PRIMARY KEY,
+                    bucket TEXT,
+                    name TEXT,
+                    rows_loaded INTEGER,
+                    ingested_at TEXT,
+                    skips INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+    def seen(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM processed_objects WHERE key = ?", (key,)).fetchone()
+            return row is not None
+
+    def mark(self, key, bucket, name, rows):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO processed_objects (key, bucket, name, rows_loaded, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, bucket, name, rows, datetime.utcnow().isoformat() + "Z"),
+            )
+
+    def record_skip(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE processed_objects SET skips = skips + 1 WHERE key = ?", (key,))
+
+    def stats(self):
+        with self._lock:
+            processed, skipped = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(skips), 0) FROM processed_objects").fetchone()
+            return {"processed": processed, "skipped": skipped}
+
+
+# Backend name -> factory(path); register custom backends here
+PROCESSED_INDEX_BACKENDS = {
+    "sqlite": SQLiteProcessedIndex,
+    "memory": lambda path: ProcessedIndex(),
+    "none": lambda path: NullProcessedIndex(),
+}
+
+processed_index = PROCESSED_INDEX_BACKENDS[PROCESSED_INDEX_BACKEND](PROCESSED_INDEX_PATH)
+
+
+def object_version_key(bucket_name, object_name, event=None):
+    """Key identifying one version of a GCS object, or None if it can't be determined.
+
+    Uses the generation (or md5/crc32c) from the notification when present and
+    otherwise looks up blob metadata, which never downloads the object.
+    """
+    event = event or {}
+    if event.get("generation"):
+        return f"{bucket_name}/{object_name}#g{event['generation']}"
+    if event.get("md5Hash") or event.get("crc32c"):
+        return f"{bucket_name}/{object_name}#h{event.get('md5Hash') or event.get('crc32c')}"
+    if not storage_client:
+        return None
+    try:
+        blob = storage_client.bucket(bucket_name).get_blob(object_name)
+    except Exception as exc:
+        print(f"Could not read metadata for gs://{bucket_name}/{object_name}: {exc}")
+        return None
+    if blob is None or not blob.generation:
+        return None
+    return f"{bucket_name}/{object_name}#g{blob.generation}"
+
+
+class QueueFull(Exception):
+    """Raised when the ingest queue has no room for another job."""
+
+
+class IngestQueue:
+    """Bounded queue of GCS ingest jobs drained by a pool of worker threads.
+
+    Jobs are deduplicated on a per-object key while queued or running, and the
+    last ``history`` jobs are kept so their status can be looked up by id.
+    """
+
+    def __init__(self, handler, workers, maxsize, history):
+        self._handler = handler
+        self._workers = workers
+        self._history = history
+        self._queue = queue.Queue(maxsize)
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, bucket, name, dedup_key, dataset=None, version_key=None, profile=False, size=None):
+        """Queue an ingest. Returns ``(job, created)``; raises QueueFull."""
+        with self._lock:
+            if dedup_key in self._active:
+                return dict(self._jobs[self._active[dedup_key]]), False
+            job_id = uuid.uuid4().hex
+            job = {
+                "id": job_id,
+                "key": dedup_key,
+                "bucket": bucket,
+                "name": name,
+                "dataset": dataset,
+                "version_key": version_key,
+                "size": size,
+                "profile": os.path.join(PROFILE_DIR, f"ingest-{job_id}.prof") if profile else None,
+                "status": "queued",
+                "rows": None,
+                "cols": None,
+                "error": None,
+                "submitted": datetime.utcnow().isoformat() + "Z",
+                "started": None,
+                "finished": None,
+            }
+            try:
+                self._queue.put_nowait(job["id"])
+            except queue.Full:
+                raise QueueFull(f"Ingest queue is full ({self._queue.maxsize} jobs)")
+            self._jobs[job["id"]] = job
+            self._active[dedup_key] = job["id"]
+            self._trim()
+            self._start_workers()
+            return dict(job), True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def drain(self, timeout):
+        """Wait up to ``timeout`` seconds for queued and running jobs to finish."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.1)
+        with self._lock:
+            unfinished = [job for job in self._jobs.values() if job["status"] in ("queued", "running")]
+        for job in unfinished:
+            print(f"ERROR: ingest of gs://{job['bucket']}/{job['name']} is still {job['status']} at shutdown "
+                  f"and will not be retried (message already acked; re-run with /backfill)")
+
+    def _trim(self):
+        # Drop the oldest finished jobs beyond the history limit
+        excess = len(self._jobs) - self._history
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id]["status"] in ("done", "error"):
+                del self._jobs[job_id]
+                excess -= 1
+
+    def _start_workers(self):
+        # Started lazily so importing the module (or forking it) spawns no threads
+        while len(self._threads) < self._workers:
+            t = threading.Thread(target=self._run, name=f"ingest-worker-{len(self._threads)}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                job = self._jobs[job_id]
+                job["status"] = "running"
+                job["started"] = datetime.utcnow().isoformat() + "Z"
+            try:
+                rows, cols = self._handler(dict(job))
+                update = {"status": "done", "rows": rows, "cols": cols}
+            except Exception as exc:
+                # The Pub/Sub message was acked on submit, so nothing will redeliver it
+                print(f"ERROR: ingest of gs://{job['bucket']}/{job['name']} failed and will not be retried "
+                      f"(message already acked; re-run with /backfill): {exc}")
+                update = {"status": "error", "error": str(exc)}
+            with self._lock:
+                job.update(update, finished=datetime.utcnow().isoformat() + "Z")
+                self._active.pop(job["key"], None)
+            self._queue.task_done()
+
+
+_ingest_process_pool = None
+_ingest_process_pool_lock = threading.Lock()
+
+
+def _ingest_executor():
+    """Process pool used when INGEST_WORKER_MODE=process, created on first use."""
+    global _ingest_process_pool
+    with _ingest_process_pool_lock:
+        if _ingest_process_pool is None:
+            import multiprocessing
+            # spawn: children build their own GCP clients instead of inheriting them
+            _ingest_process_pool = ProcessPoolExecutor(
+                max_workers=INGEST_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _ingest_process_pool
+
+
+def run_profiled(profile_path, fn, *args):
+    """Run ``fn(*args)`` under cProfile, dump stats to ``profile_path`` and print the top entries."""
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args)
+    finally:
+        profiler.dump_stats(profile_path)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(25)
+        print(f"Profile for {args} written to {profile_path}\n{report.getvalue()}")
+
+
+def run_ingest_job(job):
+    """Run one queued ingest; failures are recorded in the ingest history."""
+    try:
+        call = (ingest_gcs_object, job["bucket"], job["name"], job["dataset"], job["version_key"], job["size"])
+        if job["profile"]:
+            call = (run_profiled, job["profile"]) + call
+        if INGEST_WORKER_MODE == "process":
+            rows, cols = _ingest_executor().submit(*call).result()
+        else:
+            rows, cols = call[0](*call[1:])
+        if job["version_key"]:
+            processed_index.mark(job["version_key"], job["bucket"], job["name"], rows)
+        return rows, cols
+    except Exception as exc:
+        # Successful loads are recorded by load_to_bigquery() itself
+        try:
+            dataset = dataset_for_object(job["name"], job["dataset"])
+        except ValueError:
+            dataset = job["dataset"] or current_dataset or BQ_DATASET
+        ingest_history.add({
+            "bucket": job["bucket"],
+            "object_name": job["name"],
+            "bq_dataset": dataset,
+            "rows_loaded": 0,
+            "status": f"ERROR: {exc}",
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+        })
+        raise
+
+
+ingest_queue = IngestQueue(run_ingest_job, INGEST_WORKERS, INGEST_QUEUE_SIZE, INGEST_JOB_HISTORY)
+atexit.register(ingest_queue.drain, INGEST_SHUTDOWN_GRACE)
+
+
+class BackfillStore:
+    """Backfill parameters, progress counters and checkpoints in a SQLite file.
+
+    ``checkpoint`` is the last object name up to which every listed object has
+    finished, so a resumed backfill lists from there. Failed objects count as
+    finished and are kept in backfill_failures.
+    """
+
+    COUNTERS = ("listed", "matched", "ingested", "skipped", "failed", "rows_loaded")
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS backfills (
+                    id TEXT PRIMARY KEY,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    checkpoint TEXT,
+                    listed INTEGER NOT NULL DEFAULT 0,
+                    matched INTEGER NOT NULL DEFAULT 0,
+                    ingested INTEGER NOT NULL DEFAULT 0,
+                    skipped INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0,
+                    rows_loaded INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created TEXT,
+                    updated TEXT
+                );
+                CREATE TABLE IF NOT EXISTS backfill_failures (
+                    backfill_id TEXT,
+                    name TEXT,
+                    error TEXT,
+                    PRIMARY KEY (backfill_id, name)
+                );
+            """)
+
+    def create(self, backfill_id, params):
+        now = datetime.utcnow().isoformat() + "Z"
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO backfills (id, params, status, created, updated) VALUES (?, ?, 'pending', ?, ?)",
+                (backfill_id, json.dumps(params), now, now))
+
+    def get(self, backfill_id):
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM backfills WHERE id = ?", (backfill_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            record = dict(zip([c[0] for c in cursor.description], row))
+            record["failures"] = [dict(name=n, error=e) for n, e in self._conn.execute(
+                "SELECT name, error FROM backfill_failures WHERE backfill_id = ? LIMIT 100", (backfill_id,))]
+        record["params"] = json.loads(record["params"])
+        return record
+
+    def update(self, backfill_id, increments=None, **fields):
+        """Set ``fields`` and add ``increments`` ({counter: n}) in one write."""
+        increments = {k: v for k, v in (increments or {}).items() if v}
+        assignments = [f"{k} = ?" for k in fields] + [f"{k} = {k} + ?" for k in increments]
+        values = list(fields.values()) + list(increments.values())
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE backfills SET {', '.join(assignments + ['updated = ?'])} WHERE id = ?",
+                values + [datetime.utcnow().isoformat() + "Z", backfill_id])
+
+    def add_failure(self, backfill_id, name, error):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO backfill_failures VALUES (?, ?, ?)",
+                               (backfill_id, name, error))
+
+
+class GCSBackfillStore(BackfillStore):
+    """BackfillStore whose records are also kept as JSON objects under a gs:// prefix.
+
+    The SQLite file stays the working copy. Records are written to GCS at most
+    every ``flush_seconds`` (GCS allows about one write per second per object)
+    and on every status change; a record missing locally is loaded from GCS,
+    so a backfill started on a replaced instance resumes from its last write.
+    """
+
+    def __init__(self, path, uri, flush_seconds=BACKFILL_STATE_FLUSH_SECONDS):
+        super().__init__(path)
+        self._bucket, _, prefix = uri[len("gs://"):].partition("/")
+        self._prefix = prefix if not prefix or prefix.endswith("/") else prefix + "/"
+        self._flush_seconds = flush_seconds
+        self._flushed = {}
+        self._flush_lock = threading.Lock()
+
+    def _blob(self, backfill_id):
+        return storage_client.bucket(self._bucket).blob(f"{self._prefix}{backfill_id}.json")
+
+    def _write(self, backfill_id, force=False):
+        with self._flush_lock:
+            if not force and time.monotonic() - self._flushed.get(backfill_id, 0.0) < self._flush_seconds:
+                return
+            record = BackfillStore.get(self, backfill_id)
+            with self._lock:
+                record["failures"] = [dict(name=n, error=e) for n, e in self._conn.execute(
+                    "SELECT name, error FROM backfill_failures WHERE backfill_id = ?", (backfill_id,))]
+            try:
+                self._blob(backfill_id).upload_from_string(json.dumps(record), content_type="application/json")
+                self._flushed[backfill_id] = time.monotonic()
+            except Exception as exc:
+                print(f"Could not save backfill {backfill_id} to gs://{self._bucket}/{self._prefix}: {exc}")
+
+    def _load(self, backfill_id):
+        from google.api_core.exceptions import NotFound
+        try:
+            record = json.loads(self._blob(backfill_id).download_as_bytes())
+        except NotFound:
+            return
+        failures = record.pop("failures", [])
+        record["params"] = json.dumps(record["params"])
+        columns = ("id", "params", "status", "checkpoint") + self.COUNTERS + ("error", "created", "updated")
+        record = {k: record.get(k) for k in columns}
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO backfills ({', '.join(record)}) VALUES ({', '.join('?' * len(record))})",
+                list(record.values()))
+            self._conn.executemany("INSERT OR REPLACE INTO backfill_failures VALUES (?, ?, ?)",
+                                   [(backfill_id, f["name"], f["error"]) for f in failures])
+
+    def create(self, backfill_id, params):
+        super().create(backfill_id, params)
+        self._write(backfill_id, force=True)
+
+    def get(self, backfill_id):
+        record = super().get(backfill_id)
+        if record is None:
+            self._load(backfill_id)
+            record = super().get(backfill_id)
+        return record
+
+    def update(self, backfill_id, increments=None, **fields):
+        super().update(backfill_id, increments, **fields)
+        self._write(backfill_id, force="status" in fields)
+
+
+def _parse_utc(value):
+    """ISO date/datetime string (naive means UTC) as an aware datetime, or None."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def backfill_params(bucket, prefix="", extensions=None, updated_after=None, updated_before=None,
+                    concurrency=None, rate=None, dataset=None):
+    """Validated backfill parameters; raises ValueError."""
+    if not bucket:
+        raise ValueError("Missing bucket")
+    # A bare string would be iterated character by character
+    if extensions is not None and (not isinstance(extensions, (list, tuple))
+                                   or not all(isinstance(e, str) for e in extensions)):
+        raise ValueError('extensions must be a list of strings, e.g. [".csv"]')
+    extensions = [e.lower() if e.startswith(".") else f".{e.lower()}"
+                  for e in (extensions or [".csv", ".xlsx", ".xls"])]
+    _parse_utc(updated_after), _parse_utc(updated_before)  # reject bad dates up front
+    concurrency = max(1, int(concurrency or BACKFILL_CONCURRENCY))
+    if concurrency > BACKFILL_MAX_CONCURRENCY:
+        raise ValueError(f"concurrency must be at most {BACKFILL_MAX_CONCURRENCY}")
+    return {
+        "bucket": bucket,
+        "prefix": prefix or "",
+        "extensions": extensions,
+        "updated_after": updated_after,
+        "updated_before": updated_before,
+        "concurrency": concurrency,
+        "rate": float(BACKFILL_RATE if rate is None else rate),
+        "dataset": dataset,
+    }
+
+
+def run_backfill(backfill_id, stop=None):
+    """List a bucket prefix and ingest the matching objects; resumes from the checkpoint.
+
+    Objects are listed page by page in name order, filtered by extension and
+    ``updated`` time, and ingested through run_ingest_job() by ``concurrency``
+    threads with at most ``rate`` starts per second. Object versions already
+    in the processed index are skipped. ``stop`` (an Event) ends it early
+    with status "stopped" after the in-flight objects finish.
+    """
+    record = backfill_store.get(backfill_id)
+    params = record["params"]
+    bucket_name = params["bucket"]
+    after, before = _parse_utc(params["updated_after"]), _parse_utc(params["updated_before"])
+    extensions = tuple(params["extensions"])
+    stop = stop or threading.Event()
+    backfill_store.update(backfill_id, status="running", error=None)
+    print(f"Backfill {backfill_id}: gs://{bucket_name}/{params['prefix']} from {record['checkpoint'] or 'the start'}")
+
+    # Names in listing order with a done flag; the checkpoint advances past the finished head
+    inflight = deque()
+    slots = threading.BoundedSemaphore(params["concurrency"] * 2)
+    lock = threading.Lock()
+
+    def ingest(entry, blob):
+        counts = {}
+        try:
+            version_key = object_version_key(bucket_name, blob.name, {"generation": blob.generation})
+            if version_key and processed_index.seen(version_key):
+                processed_index.record_skip(version_key)
+                counts["skipped"] = 1
+            else:
+                rows, _ = run_ingest_job({
+                    "bucket": bucket_name, "name": blob.name, "dataset": params["dataset"],
+                    "version_key": version_key, "size": blob.size, "profile": None,
+                })
+                counts.update(ingested=1, rows_loaded=rows)
+        except Exception as exc:
+            counts["failed"] = 1
+            backfill_store.add_failure(backfill_id, blob.name, str(exc))
+        finally:
+            with lock:
+                entry[1] = True
+                checkpoint = None
+                while inflight and inflight[0][1]:
+                    checkpoint = inflight.popleft()[0]
+                fields = {"checkpoint": checkpoint} if checkpoint else {}
+                backfill_store.update(backfill_id, counts, **fields)
+            slots.release()
+
+    next_start = time.monotonic()
+    status, error = "done", None
+    pool = ThreadPoolExecutor(params["concurrency"], thread_name_prefix=f"backfill-{backfill_id[:8]}")
+    try:
+        blobs = storage_client.list_blobs(
+            bucket_name, prefix=params["prefix"] or None, page_size=BACKFILL_PAGE_SIZE,
+            start_offset=record["checkpoint"])
+        for page in blobs.pages:
+            listed = matched = 0
+            for blob in page:
+                if stop.is_set():
+                    break
+                listed += 1
+                if record["checkpoint"] and blob.name <= record["checkpoint"]:
+                    continue
+                if not blob.name.lower().endswith(extensions):
+                    continue
+                if (after and blob.updated < after) or (before and blob.updated >= before):
+                    continue
+                matched += 1
+                if params["rate"] > 0:
+                    next_start = max(next_start + 1 / params["rate"], time.monotonic())
+                    time.sleep(max(0.0, next_start - time.monotonic()))
+                slots.acquire()
+                with lock:
+                    entry = [blob.name, False]
+                    inflight.append(entry)
+                pool.submit(ingest, entry, blob)
+            backfill_store.update(backfill_id, {"listed": listed, "matched": matched})
+            if stop.is_set():
+                status = "stopped"
+                break
+    except Exception as exc:
+        status, error = "error", str(exc)
+        print(f"Backfill {backfill_id} failed: {exc}")
+    finally:
+        pool.shutdown(wait=True)
+        backfill_store.update(backfill_id, status=status, error=error)
+    record = backfill_store.get(backfill_id)
+    print(f"Backfill {backfill_id} {status}: {', '.join(f'{k}={record[k]}' for k in BackfillStore.COUNTERS)}")
+    return record
+
+
+_backfills = {}
+_backfills_lock = threading.Lock()
+
+
+def start_backfill(params=None, backfill_id=None):
+    """Run a backfill in a background thread. Returns ``(record, started)``.
+
+    With ``backfill_id`` of an existing backfill that isn't running or done,
+    it resumes from its checkpoint with its original parameters.
+    """
+    with _backfills_lock:
+        if backfill_id:
+            record = backfill_store.get(backfill_id)
+            if record is None:
+                raise KeyError(backfill_id)
+            running = backfill_id in _backfills and _backfills[backfill_id][0].is_alive()
+            if running or record["status"] == "done":
+                return record, False
+        else:
+            backfill_id = uuid.uuid4().hex
+            backfill_store.create(backfill_id, params)
+        stop = threading.Event()
+        thread = threading.Thread(target=run_backfill, args=(backfill_id, stop),
+                                  name=f"backfill-{backfill_id[:8]}", daemon=True)
+        _backfills[backfill_id] = (thread, stop)
+        thread.start()
+    return backfill_store.get(backfill_id), True
+
+
+def stop_backfills():
+    """Ask running backfills to stop; their checkpoints let them resume later."""
+    with _backfills_lock:
+        for thread, stop in _backfills.values():
+            stop.set()
+
+
+if BACKFILL_STATE_URI:
+    backfill_store = GCSBackfillStore(BACKFILL_STATE_PATH, BACKFILL_STATE_URI)
+else:
+    backfill_store = BackfillStore(BACKFILL_STATE_PATH)
+atexit.register(stop_backfills)
+
+
+def backfill_cli(argv):
+    """``python app.py backfill gs://bucket/prefix [options]``: run a backfill in the foreground."""
+    import argparse
+    parser = argparse.ArgumentParser(prog="app.py backfill", description=backfill_cli.__doc__)
+    parser.add_argument("uri", nargs="?", help="gs://bucket/prefix to ingest")
+    parser.add_argument("--ext", nargs="+", help="Extensions to ingest (default .csv .xlsx .xls)")
+    parser.add_argument("--updated-after", help="Only objects updated at/after this ISO date/time (UTC)")
+    parser.add_argument("--updated-before", help="Only objects updated before this ISO date/time (UTC)")
+    parser.add_argument("--concurrency", type=int, default=BACKFILL_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=BACKFILL_RATE, help="Max objects started per second")
+    parser.add_argument("--dataset", help="BigQuery dataset (default BQ_DATASET)")
+    parser.add_argument("--resume", metavar="BACKFILL_ID", help="Resume an interrupted backfill")
+    args = parser.parse_args(argv)
+    if not storage_client:
+        parser.error("Storage client not configured. Set PROJECT_ID.")
+
+    if args.resume:
+        backfill_id = args.resume
+        if backfill_store.get(backfill_id) is None:
+            parser.error(f"Unknown backfill {backfill_id}")
+    else:
+        if not args.uri or not args.uri.startswith("gs://"):
+            parser.error("Expected gs://bucket/prefix")
+        bucket, _, prefix = args.uri[len("gs://"):].partition("/")
+        try:
+            params = backfill_params(bucket, prefix, args.ext, args.updated_after, args.updated_before,
+                                     args.concurrency, args.rate, args.dataset)
+        except ValueError as exc:
+            parser.error(str(exc))
+        backfill_id = uuid.uuid4().hex
+        backfill_store.create(backfill_id, params)
+        print(f"Backfill id {backfill_id} (resume with --resume {backfill_id})")
+
+    stop = threading.Event()
+    worker = threading.Thread(target=run_backfill, args=(backfill_id, stop))
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.5)
+    except KeyboardInterrupt:
+        print("Stopping after in-flight objects finish...")
+        stop.set()
+        worker.join()
+    ingestion_log.flush()
+    record = backfill_store.get(backfill_id)
+    return 0 if record["status"] == "done" and not record["failed"] else 1
+
+
+metrics.register(CallbackMetric(
+    "ingest_queue_depth", "Ingest jobs waiting for a worker.", "gauge",
+    lambda: {None: ingest_queue.depth()}))
+metrics.register(CallbackMetric(
+    "ingestion_log_pending", "ingestion_log records waiting to be flushed.", "gauge",
+    lambda: {None: ingestion_log.pending()}))
+metrics.register(CallbackMetric(
+    "metadata_cache_requests_total", "Metadata cache lookups by result.", "counter",
+    lambda: {("hit",): metadata_cache.hits, ("miss",): metadata_cache.misses}, ["result"]))
+metrics.register(CallbackMetric(
+    "processed_objects_total", "Object versions in the processed-object index.", "gauge",
+    lambda: {None: processed_index.stats()["processed"]}))
+metrics.register(CallbackMetric(
+    "duplicate_deliveries_skipped_total", "Pub/Sub deliveries skipped as already ingested.", "counter",
+    lambda: {None: processed_index.stats()["skipped"]}))
+metrics.register(CallbackMetric(
+    "process_peak_rss_bytes", "Peak resident set size of this process since the last idle ingest start.", "gauge",
+    lambda: {None: peak_rss_bytes() or 0}))
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def _observe_request_latency(response):
+    start = getattr(g, "request_start", None)
+    if start is not None and request.endpoint != "metrics_endpoint":
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_SECONDS.observe(time.perf_counter() - start, route=route, method=request.method,
+                             status=response.status_code)
+    return response
+
+
+def warm_up():
+    """Import the heavy modules and build the clients now; returns seconds per step."""
+    timings = {}
+    steps = [("pandas", pd), ("pyarrow", pa), ("pyarrow.csv", pa_csv), ("pyarrow.compute", pc), ("pyarrow.parquet", pq),
+             ("google.cloud.storage", storage), ("google.cloud.bigquery", bigquery),
+             ("storage_client", storage_client), ("bq_client", bq_client)]
+    for name, target in steps:
+        if isinstance(target, LazyLoader):
+            start = time.perf_counter()
+            target.load()
+            timings[name] = round(time.perf_counter() - start, 3)
+    return timings
+
+
+def _warm_up_in_background():
+    try:
+        print(f"Warm-up finished: {warm_up()}")
+    except Exception as exc:
+        print(f"Warm-up failed: {exc}")
+
+
+if WARMUP_ON_START:
+    threading.Thread(target=_warm_up_in_background, name="warm-up", daemon=True).start()
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness check; never imports pandas/pyarrow or builds a client."""
+    return jsonify({"status": "ok", "warm": all(
+        target.loaded for target in (pd, pa, storage_client, bq_client) if isinstance(target, LazyLoader))})
+
+
+@app.route("/warmup", methods=["GET"])
+def warmup():
+    """Finish initialization before traffic arrives (e.g. as a startup probe)."""
+    return jsonify({"status": "ok", "seconds": warm_up()})
+
+
+def dashboard_context():
+    """Buckets, datasets and the page of ingest history the dashboard shows."""
+    # Get list of buckets
+    buckets = []
+    if storage_client:
+        try:
+            buckets = metadata_cache.get_or_load(
+                "buckets", lambda: [b.name for b in storage_client.list_buckets()])
+        except:
+            buckets = ["my-data-uploads"]  # fallback
+    
+    # Get list of BigQuery datasets
     datasets = []
     if bq_client:
         try:
-            datasets = [ds.dataset_id for ds in bq_client.list_datasets()]
+            datasets = metadata_cache.get_or_load(
+                "datasets", lambda: [ds.dataset_id for ds in bq_client.list_datasets()])
         except:
             datasets = []
     
     # Use current_dataset if set, otherwise use default BQ_DATASET
     active_dataset = current_dataset or BQ_DATASET
     
-    # Load recent ingestions from BigQuery instead of in-memory list
-    ingestions_display = []
-    if bq_client and active_dataset:
+    # Recent ingestions come from the local ingest history, paged with ?cursor=
+    ingestions_display, ingestions_cursor = [], None
+    if active_dataset:
+        if bq_client:
+            ingest_history.seed(active_dataset, lambda before: load_ingestion_log(active_dataset, before))
         try:
-            # Query ingestion_log and compute BigQuery destination table name from object_name
-            query = f"""
-                SELECT bucket, object_name as name, rows_loaded as row_count, status, 
-                       FORMAT_TIMESTAMP('%Y-%m-%dT%H:%M:%SZ', timestamp) as timestamp,
-                       '{active_dataset}' as bq_dataset,
-                       REGEXP_REPLACE(SPLIT(object_name, '.')[OFFSET(0)], r'[^a-zA-Z0-9_]', '_') as bq_table
-                FROM `{PROJECT_ID}.{active_dataset}.ingestion_log`
-                ORDER BY timestamp DESC
-                LIMIT 10
-            """
-            query_job = bq_client.query(query)
-            ingestions_display = [dict(row) for row in query_job.result()]
-        except Exception as e:
-            print(f"Failed to load ingestions from BigQuery: {e}")
+            cursor = decode_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+        except ValueError:
+            cursor = None
+        ingestions_display, ingestions_cursor = ingest_history.page(active_dataset, cursor)
+    return {
+        "buckets": buckets,
+        "datasets": datasets,
+        "ingests": ingestions_display,
+        "ingests_cursor": encode_cursor(ingestions_cursor),
+        "paged": bool(request.args.get("cursor")),
+    }
+
+
+def format_bytes(n):
+    """``n`` bytes as a short human-readable size (e.g. ``512 KB``, ``1.5 GB``)."""
+    for unit in ("bytes", "KB", "MB"):
+        if n < 1024:
+            break
+        n /= 1024
+    else:
+        unit = "GB"
+    return f"{n:.1f}".rstrip("0").rstrip(".") + f" {unit}"
+
 
+@app.route("/", methods=["GET", "POST"])
+def index():
+    global BQ_DATASET, current_dataset
+    
+    preview = None
+    message = None
+    dashboard = dashboard_context()
     upload_results = []
     
     if request.method == "POST":
@@ -378,6 +3365,7 @@ def index():
                     dataset = bigquery.Dataset(dataset_id)
                     dataset.location = "US"
                     bq_client.create_dataset(dataset, exists_ok=True)
+                    metadata_cache.invalidate("datasets")
                     message = f"✅ Created dataset: {dataset_name}"
                 
                 # Store as current dataset for this container instance
@@ -387,16 +3375,7 @@ def index():
                 
                 # Create ingestion_log table if doesn't exist
                 table_id = f"{PROJECT_ID}.{dataset_name}.ingestion_log"
-                schema = [
-                    bigquery.SchemaField("bucket", "STRING"),
-                    bigquery.SchemaField("object_name", "STRING"),
-                    bigquery.SchemaField("bq_dataset", "STRING"),
-                    bigquery.SchemaField("bq_table", "STRING"),
-                    bigquery.SchemaField("rows_loaded", "INTEGER"),
-                    bigquery.SchemaField("status", "STRING"),
-                    bigquery.SchemaField("timestamp", "TIMESTAMP"),
-                ]
-                table = bigquery.Table(table_id, schema=schema)
+                table = bigquery.Table(table_id, schema=ingestion_log_schema())
                 bq_client.create_table(table, exists_ok=True)
             except Exception as e:
                 message = f"⚠️ Dataset error: {e}"
@@ -405,57 +3384,62 @@ def index():
             message = message if message else "No file uploaded."
         else:
             try:
-                preview = parse_upload(uploaded)
-                recent_uploads.insert(0, {**preview, "timestamp": datetime.utcnow().isoformat() + "Z"})
-                del recent_uploads[10:]
+                # Read once (large uploads stay in their spool file); the preview
+                # and the bucket uploads share it
+                with open_upload(uploaded) as (data, source):
+                    preview = parse_upload(uploaded, data)
+                    ingest_history.add_upload({**preview, "timestamp": datetime.utcnow().isoformat() + "Z"})
                 
-                # If user chose "Upload to GCS", upload to selected buckets
-                if action == "upload" and selected_buckets and storage_client:
-                    # Construct object path with folder
-                    if folder_path:
-                        # Ensure folder ends with /
-                        if not folder_path.endswith("/"):
-                            folder_path += "/"
-                        object_name = folder_path + uploaded.filename
-                    else:
-                        object_name = uploaded.filename
-                    
-                    # Upload to each selected bucket
-                    for bucket_name in selected_buckets:
-                        uploaded.seek(0)  # Reset file pointer for each upload
-                        bucket = storage_client.bucket(bucket_name)
-                        blob = bucket.blob(object_name)
-                        blob.upload_from_file(uploaded)
-                        
-                        # Generate table name from object name
-                        import re
-                        table_name = re.sub(r'[^a-zA-Z0-9_]', '_', object_name.rsplit('.', 1)[0])
-                        bq_table = f"{PROJECT_ID}.{BQ_DATASET}.{table_name}"
-                        
-                        upload_results.append({
-                            "bucket": bucket_name,
-                            "object": object_name,
-                            "bq_table": bq_table
-                        })
+                    # If user chose "Upload to GCS", upload to selected buckets
+                    if action == "upload" and selected_buckets and storage_client:
+                        # Construct object path with folder
+                        if folder_path:
+                            # Ensure folder ends with /
+                            if not folder_path.endswith("/"):
+                                folder_path += "/"
+                            object_name = folder_path + uploaded.filename
+                        else:
+                            object_name = uploaded.filename
                     
-                    message = f"✅ File uploaded to {len(selected_buckets)} bucket(s)"
-                else:
-                    message = "Upload parsed successfully (preview only)."
+                        # Generate table name from object name (or its INGEST_TABLE_ROUTES target)
+                        table_name = default_table_name(object_name)
+                        bq_table = f"{PROJECT_ID}.{dataset_for_object(object_name)}.{table_name}"
+
+                        # Fan out to all selected buckets in parallel
+                        for result in upload_to_buckets(source, object_name, selected_buckets, uploaded.mimetype or None):
+                            upload_results.append({**result, "bq_table": bq_table})
+
+                        failed = sum(1 for r in upload_results if r["error"])
+                        if failed:
+                            message = f"⚠️ File uploaded to {len(selected_buckets) - failed} of {len(selected_buckets)} bucket(s)"
+                        else:
+                            message = f"✅ File uploaded to {len(selected_buckets)} bucket(s)"
+                    else:
+                        message = "Upload parsed successfully (preview only)."
             except Exception as exc:  # brief error message to UI
                 message = f"Error: {exc}"
 
-    return render_template_string(HTML_TEMPLATE, uploads=recent_uploads, preview=preview, message=message, ingests=ingestions_display, buckets=buckets, upload_results=upload_results, datasets=datasets)
+    return render_template_string(HTML_TEMPLATE, uploads=ingest_history.uploads(), preview=preview, message=message, upload_results=upload_results, **dashboard)
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(exc):
+    message = f"⚠️ Upload is larger than the {format_bytes(UPLOAD_MAX_BYTES)} limit"
+    if request.path == "/":
+        # The full dashboard, so the user can pick a smaller file and resubmit
+        return render_template_string(HTML_TEMPLATE, uploads=ingest_history.uploads(), message=message,
+                                      upload_results=[], **dashboard_context()), 413
+    return jsonify({"error": message}), 413
 
 
 @app.route("/hook", methods=["POST"])
 def hook():
+    """Validate a Pub/Sub GCS event and queue its ingest; acks before loading."""
     payload = request.get_json(silent=True) or {}
     print("✅ JSON TRIGGER RECEIVED")
     print(json.dumps(payload, indent=2))
 
     # Expecting Pub/Sub push with message.data base64 containing GCS event
-    bucket = ""
-    name = ""
     try:
         msg = payload.get("message", {})
         data_b64 = msg.get("data")
@@ -466,31 +3450,145 @@ def hook():
         name = event_json.get("name", "")
         if not bucket or not name:
             raise ValueError("Missing bucket/name in event")
-
-        rows, cols = ingest_gcs_object(bucket, name)
-        recent_ingests.insert(0, {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "bucket": bucket,
-            "name": name,
-            "rows": rows,
-            "status": "OK"
-        })
-        del recent_ingests[10:]
-        return "OK"
+        # GCS sends the size as a decimal string; without it the ingest reads the metadata
+        size = int(event_json["size"]) if str(event_json.get("size", "")).isdigit() else None
     except Exception as exc:
-        recent_ingests.insert(0, {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "bucket": bucket,
-            "name": name,
-            "rows": 0,
-            "status": f"ERROR: {exc}"
-        })
-        del recent_ingests[10:]
         print(f"ERROR: {exc}")
         return f"Error: {exc}", 400
 
+    # Dead-letter objects written by contract checks are not ingested themselves
+    if DEAD_LETTER_PREFIX and name.startswith(DEAD_LETTER_PREFIX):
+        print(f"Ignoring dead-letter object gs://{bucket}/{name}")
+        return jsonify({"status": "ignored", "reason": "dead-letter object"}), 200
+
+    # Already-ingested object versions are acked without downloading anything
+    version_key = object_version_key(bucket, name, event_json)
+    if version_key and processed_index.seen(version_key):
+        processed_index.record_skip(version_key)
+        print(f"Skipping duplicate delivery for {version_key}")
+        return jsonify({"status": "duplicate", "key": version_key}), 200
+
+    # One job per object version; redeliveries while it is pending reuse it
+    dedup_key = version_key or f"{bucket}/{name}"
+    try:
+        job, created = ingest_queue.submit(
+            bucket, name, dedup_key, dataset_for_object(name), version_key,
+            profile=request.args.get("profile") == "1", size=size,
+        )
+    except QueueFull as exc:
+        # Non-2xx makes Pub/Sub redeliver later with backoff
+        print(f"Backpressure: {exc}")
+        return jsonify({"error": str(exc)}), 503, {"Retry-After": "30"}
+
+    return jsonify({"job_id": job["id"], "status": job["status"]}), 202 if created else 200
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(metadata_cache.stats())
+
+
+@app.route("/processed/stats", methods=["GET"])
+def processed_stats():
+    return jsonify(processed_index.stats())
+
+
+@app.route("/ingestions", methods=["GET"])
+def ingestions():
+    """Page through the ingest history: ?dataset=&cursor=&limit= (max 500)."""
+    dataset = request.args.get("dataset") or current_dataset or BQ_DATASET
+    if not dataset:
+        return jsonify({"error": "No dataset selected"}), 400
+    try:
+        cursor = decode_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+        limit = min(max(int(request.args.get("limit", "50")), 1), 500)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if bq_client:
+        ingest_history.seed(dataset, lambda before: load_ingestion_log(dataset, before))
+    records, next_cursor = ingest_history.page(dataset, cursor, limit)
+    return jsonify({"dataset": dataset, "items": records, "next_cursor": encode_cursor(next_cursor)})
+
+
+def require_backfill_token(view):
+    """Reject requests without ``Authorization: Bearer <BACKFILL_API_TOKEN>``."""
+    @functools.wraps(view)
+    def checked(*args, **kwargs):
+        import hmac
+        if not BACKFILL_API_TOKEN:
+            return jsonify({"error": "Backfill API disabled. Set BACKFILL_API_TOKEN."}), 403
+        supplied = request.headers.get("Authorization", "").encode()
+        if not hmac.compare_digest(supplied, f"Bearer {BACKFILL_API_TOKEN}".encode()):
+            return jsonify({"error": "Unauthorized"}), 401, {"WWW-Authenticate": "Bearer"}
+        return view(*args, **kwargs)
+    return checked
+
+
+@app.route("/backfill", methods=["POST"])
+@require_backfill_token
+def backfill():
+    """Start (or, with "backfill_id", resume) a backfill of a bucket prefix."""
+    payload = request.get_json(silent=True) or {}
+    if not storage_client:
+        return jsonify({"error": "Storage client not configured. Set PROJECT_ID."}), 503
+    if not BACKFILL_STATE_URI:
+        # Checkpoints in the instance's /tmp are gone when it is replaced
+        return jsonify({"error": "Set BACKFILL_STATE_URI for durable backfill state, "
+                                 "or run `python app.py backfill` instead."}), 503
+    if payload.get("bucket") and BACKFILL_BUCKETS and payload["bucket"] not in BACKFILL_BUCKETS:
+        return jsonify({"error": f"Bucket {payload['bucket']!r} is not in BACKFILL_BUCKETS"}), 403
+    try:
+        if payload.get("backfill_id"):
+            record, started = start_backfill(backfill_id=payload["backfill_id"])
+        else:
+            params = backfill_params(
+                payload.get("bucket"), payload.get("prefix"), payload.get("extensions"),
+                payload.get("updated_after"), payload.get("updated_before"),
+                payload.get("concurrency"), payload.get("rate"), payload.get("dataset"))
+            record, started = start_backfill(params)
+    except KeyError:
+        return jsonify({"error": "Unknown backfill id"}), 404
+    except (TypeError, ValueError) as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(record), 202 if started else 200
+
+
+@app.route("/backfill/<backfill_id>", methods=["GET"])
+@require_backfill_token
+def backfill_status(backfill_id):
+    record = backfill_store.get(backfill_id)
+    if record is None:
+        return jsonify({"error": "Unknown backfill id"}), 404
+    return jsonify(record)
+
+
+@app.route("/backfill/<backfill_id>/stop", methods=["POST"])
+@require_backfill_token
+def backfill_stop(backfill_id):
+    with _backfills_lock:
+        running = _backfills.get(backfill_id)
+    if running is None or not running[0].is_alive():
+        return jsonify({"error": "Backfill is not running here"}), 404
+    running[1].set()
+    return jsonify({"backfill_id": backfill_id, "status": "stopping"}), 202
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = ingest_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(job)
+
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["backfill"]:
+        sys.exit(backfill_cli(sys.argv[2:]))
     port = int(os.environ.get("PORT", 8080))
     app.run(host="0.0.0.0", port=port)
  
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""Compare pd.read_excel against the streaming openpyxl -> Arrow Excel path.
+
+Both paths end in a local Parquet file (what gets sent to BigQuery), and each
+(path, rows) pair runs in a fresh subprocess so peak RSS is isolated.
+
+    python benchmarks/bench_excel.py --rows 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_load_paths import ROOT, peak_rss_kb  # noqa: F401  (ROOT puts the app on sys.path)
+
+
+def make_xlsx(path, rows):
+    """Write a synthetic single-sheet workbook with int, float, str and date columns."""
+    import datetime
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("data")
+    ws.append(["id", "value", "name", "created"])
+    start = datetime.datetime(2026, 1, 1)
+    for i in range(rows):
+        ws.append([i, i * 0.25, f"name_{i % 5000}", start + datetime.timedelta(seconds=i)])
+    wb.save(path)
+
+
+def run_worker(mode, path):
+    import app
+    import openpyxl
+    import pandas as pd
+    import pyarrow as pa
+
+    baseline_kb = peak_rss_kb()
+    start = time.perf_counter()
+    with tempfile.NamedTemporaryFile(suffix=".parquet") as out:
+        if mode == "read_excel":
+            df = pd.read_excel(path)
+            rows, _ = app.write_parquet_spool(pa.Table.from_pandas(df, preserve_index=False).to_reader(), out.name)
+        else:
+            wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+            try:
+                rows, _ = app.write_parquet_spool(app.excel_sheet_reader(wb.worksheets[0]), out.name)
+            finally:
+                wb.close()
+    elapsed = time.perf_counter() - start
+    peak_kb = peak_rss_kb()
+    print(json.dumps({
+        "mode": mode,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed) if elapsed else None,
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "peak_rss_delta_mb": round((peak_kb - baseline_kb) / 1024, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--modes", nargs="+", default=["read_excel", "streaming"])
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "trigger-bench"))
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "XLSX"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = []
+    for rows in args.rows:
+        path = os.path.join(args.data_dir, f"synthetic_{rows}.xlsx")
+        if not os.path.exists(path):
+            print(f"generating {path} ...", file=sys.stderr)
+            make_xlsx(path, rows)
+        for mode in args.modes:
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", mode, path],
+                check=True, capture_output=True, text=True,
+            )
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            result["xlsx_mb"] = round(os.path.getsize(path) / 1024 / 1024, 1)
+            results.append(result)
+            print(f"{rows:>10} rows  {mode:<10}  {result['seconds']:>8.2f}s  "
+                  f"{result['rows_per_sec']:>10} rows/s  peak RSS {result['peak_rss_mb']:>7.1f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Compare the pandas and Arrow/Parquet paths of load_to_bigquery.
+
+Each (engine, rows) pair runs in a fresh subprocess so peak RSS is isolated.
+BigQuery is replaced by a sink that serializes/reads the payload the same way
+the real client would and then discards it, so the numbers cover parsing and
+serialization inside the container, not the load job itself.
+
+    python benchmarks/bench_load_paths.py --rows 10000 1000000 10000000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class _Job:
+    def __init__(self, rows=0):
+        self.output_rows = rows
+
+    def result(self, *args, **kwargs):
+        return self
+
+
+class _Table:
+    def __init__(self, schema):
+        self.schema = schema
+
+
+class SinkBigQueryClient:
+    """Accepts load jobs, pays the serialization cost, keeps nothing."""
+
+    def __init__(self):
+        self.bytes = 0
+        self.schemas = {}
+
+    def load_table_from_dataframe(self, df, table_id, job_config=None, **kwargs):
+        from google.cloud import bigquery
+        with tempfile.TemporaryFile() as tmp:
+            df.to_parquet(tmp, engine="pyarrow", index=False)
+            self.bytes += tmp.tell()
+        self.schemas.setdefault(table_id, [bigquery.SchemaField(str(c), "STRING") for c in df.columns])
+        return _Job(len(df))
+
+    def load_table_from_file(self, fileobj, table_id, job_config=None, **kwargs):
+        while True:
+            chunk = fileobj.read(1024 * 1024)
+            if not chunk:
+                break
+            self.bytes += len(chunk)
+        return _Job()
+
+    def get_table(self, table_id):
+        return _Table(self.schemas.get(table_id, []))
+
+    def copy_table(self, *args, **kwargs):
+        return _Job()
+
+    def delete_table(self, *args, **kwargs):
+        pass
+
+
+def peak_rss_kb():
+    """Peak RSS of this process in KB.
+
+    VmHWM is reset by exec, unlike ru_maxrss which can carry the parent's peak.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def make_csv(path, rows):
+    """Write a synthetic CSV with int, float, string, bool and timestamp columns."""
+    import numpy as np
+    import pandas as pd
+
+    step = 1_000_000
+    with open(path, "w") as f:
+        for start in range(0, rows, step):
+            n = min(step, rows - start)
+            ids = np.arange(start, start + n)
+            df = pd.DataFrame({
+                "id": ids,
+                "value": np.random.default_rng(start).random(n) * 1000,
+                "name": np.char.add("name_", (ids % 5000).astype(str)),
+                "flag": ids % 3 == 0,
+                "created": pd.Timestamp("2026-01-01") + pd.to_timedelta(ids % 86400, unit="s"),
+            })
+            df.to_csv(f, index=False, header=start == 0)
+
+
+def run_worker(engine, path):
+    import app
+
+    baseline_kb = peak_rss_kb()
+    sink = SinkBigQueryClient()
+    app.bq_client = sink
+    app.PROJECT_ID = "bench"
+    app.BQ_DATASET = "bench"
+
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        if engine == "arrow":
+            data = app.open_arrow_csv(f)
+        else:
+            data = app.iter_csv_chunks(f, [0, 0])
+        rows = app.load_to_bigquery(data, "bench", "t.csv")
+    elapsed = time.perf_counter() - start
+    peak_kb = peak_rss_kb()
+    print(json.dumps({
+        "engine": engine,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed) if elapsed else None,
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "peak_rss_delta_mb": round((peak_kb - baseline_kb) / 1024, 1),
+        "payload_mb": round(sink.bytes / 1024 / 1024, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--engines", nargs="+", default=["pandas", "arrow"])
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "trigger-bench"))
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--worker", nargs=2, metavar=("ENGINE", "CSV"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = []
+    for rows in args.rows:
+        path = os.path.join(args.data_dir, f"synthetic_{rows}.csv")
+        if not os.path.exists(path):
+            print(f"generating {path} ...", file=sys.stderr)
+            make_csv(path, rows)
+        for engine in args.engines:
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", engine, path],
+                check=True, capture_output=True, text=True,
+            )
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            result["csv_mb"] = round(os.path.getsize(path) / 1024 / 1024, 1)
+            results.append(result)
+            print(f"{rows:>10} rows  {engine:<6}  {result['seconds']:>8.2f}s  "
+                  f"{result['rows_per_sec']:>10} rows/s  peak RSS {result['peak_rss_mb']:>7.1f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Scaling of the parallel CSV parse (open_parallel_csv) against the streaming reader.
+
+Every run parses a local CSV into a Parquet spool (what gets sent to BigQuery)
+in a fresh subprocess so peak RSS is isolated. "sequential" is open_arrow_csv;
+the others split the file into byte ranges parsed by N threads or processes.
+
+    python benchmarks/bench_parallel_parse.py --rows 1000000 10000000 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_load_paths import ROOT, make_csv, peak_rss_kb  # noqa: F401  (ROOT puts the app on sys.path)
+
+
+def run_worker(mode, workers, path):
+    import app
+
+    baseline_kb = peak_rss_kb()
+    start = time.perf_counter()
+    with tempfile.NamedTemporaryFile(suffix=".parquet") as out:
+        if mode == "sequential":
+            with open(path, "rb") as f:
+                rows, _ = app.write_parquet_spool(app.open_arrow_csv(f), out.name)
+        else:
+            rows, _ = app.write_parquet_spool(app.open_parallel_csv(path, workers, mode), out.name)
+    elapsed = time.perf_counter() - start
+    peak_kb = peak_rss_kb()
+    print(json.dumps({
+        "mode": mode,
+        "workers": workers,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed) if elapsed else None,
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "peak_rss_delta_mb": round((peak_kb - baseline_kb) / 1024, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--modes", nargs="+", choices=["threads", "process"], default=["threads", "process"])
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "trigger-bench"))
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--worker", nargs=3, metavar=("MODE", "WORKERS", "CSV"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        mode, workers, path = args.worker
+        run_worker(mode, int(workers), path)
+        return
+
+    cpus = os.cpu_count() or 1
+    print(f"{cpus} CPU(s)", file=sys.stderr)
+    if max(args.workers) > cpus:
+        print(f"warning: runs with more than {cpus} worker(s) share CPUs and can't show scaling; "
+              f"run on a machine with at least {max(args.workers)} cores", file=sys.stderr)
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = []
+    for rows in args.rows:
+        path = os.path.join(args.data_dir, f"synthetic_{rows}.csv")
+        if not os.path.exists(path):
+            print(f"generating {path} ...", file=sys.stderr)
+            make_csv(path, rows)
+        runs = [("sequential", 1)] + [(mode, n) for mode in args.modes for n in args.workers]
+        baseline = None
+        for mode, workers in runs:
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", mode, str(workers), path],
+                check=True, capture_output=True, text=True,
+            )
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            result["csv_mb"] = round(os.path.getsize(path) / 1024 / 1024, 1)
+            baseline = baseline or result["seconds"]
+            result["speedup"] = round(baseline / result["seconds"], 2) if result["seconds"] else None
+            results.append(result)
+            print(f"{rows:>10} rows  {mode:<10} x{workers:<3} {result['seconds']:>8.2f}s  "
+                  f"{result['rows_per_sec']:>10} rows/s  x{result['speedup']:<5} "
+                  f"peak RSS {result['peak_rss_mb']:>7.1f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""End-to-end benchmark of the upload/ingest pipeline against local fakes.
+
+Drives the real Flask routes through the test client, with GCS and BigQuery
+replaced by benchmarks/fakes.py:
+
+    preview   POST /      action=preview
+    upload    POST /      action=upload to one bucket
+    hook      POST /hook  synthetic Pub/Sub GCS event, timed until the job is done
+
+over a matrix of row counts, column counts and formats. Every (case, op) runs in
+a fresh subprocess so peak RSS is isolated. Results are saved as JSON (with the
+current commit) and can be compared against an earlier run, or against the
+same tree with different settings (--env is passed to every worker):
+
+    python benchmarks/bench_pipeline.py --rows 1000 100000 --cols 5 20 --output before.json
+    python benchmarks/bench_pipeline.py --rows 1000 100000 --cols 5 20 --compare before.json
+    python benchmarks/bench_pipeline.py --ops hook --env INGEST_URI_LOAD_MIN_BYTES=0 --compare before.json
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_load_paths import ROOT, peak_rss_kb
+
+OPS = ("preview", "upload", "hook")
+BUCKET = "bench-bucket"
+
+
+def make_file(path, fmt, rows, cols):
+    """Synthetic file whose columns cycle through int, float, string and date."""
+    import datetime
+
+    def row(i):
+        values = []
+        for c in range(cols):
+            kind = c % 4
+            if kind == 0:
+                values.append(i + c)
+            elif kind == 1:
+                values.append(round(i * 0.37 + c, 3))
+            elif kind == 2:
+                values.append(f"value_{(i + c) % 997}")
+            else:
+                values.append(datetime.date(2026, 1, 1) + datetime.timedelta(days=(i + c) % 365))
+        return values
+
+    header = [f"col_{c}" for c in range(cols)]
+    if fmt == "csv":
+        import csv
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for i in range(rows):
+                writer.writerow(row(i))
+    else:
+        import openpyxl
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("data")
+        ws.append(header)
+        for i in range(rows):
+            ws.append(row(i))
+        wb.save(path)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def run_worker(op, path, rows, iterations):
+    os.environ.setdefault("PROCESSED_INDEX_BACKEND", "none")
+    import app
+    import fakes
+
+    store = tempfile.mkdtemp(prefix="fake-gcs-")
+    app.storage_client = fakes.FakeStorageClient(store)
+    app.bq_client = fakes.FakeBigQueryClient(datasets=["bench"], storage=app.storage_client)
+    app.PROJECT_ID = "bench-project"
+    app.BQ_DATASET = "bench"
+    client = app.app.test_client()
+
+    filename = os.path.basename(path)
+    with open(path, "rb") as f:
+        payload = f.read()
+    os.makedirs(os.path.join(store, BUCKET), exist_ok=True)
+    with open(os.path.join(store, BUCKET, filename), "wb") as f:
+        f.write(payload)
+
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        if op in ("preview", "upload"):
+            response = client.post("/", data={
+                "file": (io.BytesIO(payload), filename),
+                "action": op,
+                "buckets": [BUCKET],
+            }, content_type="multipart/form-data")
+            assert response.status_code == 200, response.status_code
+        else:
+            event = {"bucket": BUCKET, "name": filename, "generation": str(i + 1), "size": str(len(payload))}
+            response = client.post("/hook", json={"message": {
+                "data": base64.b64encode(json.dumps(event).encode()).decode()}})
+            assert response.status_code in (200, 202), response.get_data(as_text=True)
+            job_id = response.get_json()["job_id"]
+            while True:
+                job = client.get(f"/jobs/{job_id}").get_json()
+                if job["status"] in ("done", "error"):
+                    break
+                time.sleep(0.002)
+            if job["status"] == "error":
+                raise RuntimeError(job["error"])
+        latencies.append(time.perf_counter() - start)
+
+    total = sum(latencies)
+    print(json.dumps({
+        "op": op,
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(total / iterations * 1000, 2),
+        "rows_per_sec": round(rows * iterations / total) if total else None,
+        "mb_per_sec": round(len(payload) * iterations / total / 1024 / 1024, 2) if total else None,
+        "peak_rss_mb": round(peak_rss_kb() / 1024, 1),
+        "bq_bytes_loaded": app.bq_client.bytes_loaded,
+    }))
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    key = lambda r: (r["format"], r["rows"], r["cols"], r["op"])
+    before = {key(r): r for r in baseline["results"]}
+    print(f"\ncompared with {baseline_path} (commit {baseline.get('commit')})")
+    for r in results:
+        old = before.get(key(r))
+        if not old:
+            continue
+        delta = (r["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100 if old["p50_ms"] else 0.0
+        print(f"{r['format']:<5}{r['rows']:>9} rows {r['cols']:>4} cols  {r['op']:<8} "
+              f"p50 {old['p50_ms']:>9.1f} -> {r['p50_ms']:>9.1f} ms ({delta:+.1f}%)  "
+              f"RSS {old['peak_rss_mb']:.0f} -> {r['peak_rss_mb']:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--cols", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--formats", nargs="+", choices=["csv", "xlsx"], default=["csv", "xlsx"])
+    parser.add_argument("--ops", nargs="+", choices=OPS, default=list(OPS))
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "trigger-bench"))
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Environment setting for the app under test (repeatable)")
+    parser.add_argument("--worker", nargs=4, metavar=("OP", "PATH", "ROWS", "ITERATIONS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        op, path, rows, iterations = args.worker
+        run_worker(op, path, int(rows), int(iterations))
+        return
+
+    env = dict(os.environ)
+    env.update(item.split("=", 1) for item in args.env)
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = []
+    for fmt in args.formats:
+        for rows in args.rows:
+            for cols in args.cols:
+                path = os.path.join(args.data_dir, f"pipeline_{rows}x{cols}.{fmt}")
+                if not os.path.exists(path):
+                    print(f"generating {path} ...", file=sys.stderr)
+                    make_file(path, fmt, rows, cols)
+                for op in args.ops:
+                    out = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__), "--worker", op, path, str(rows), str(args.iterations)],
+                        capture_output=True, text=True, env=env,
+                    )
+                    if out.returncode != 0:
+                        print(f"{fmt} {rows}x{cols} {op} failed:\n{out.stderr[-2000:]}", file=sys.stderr)
+                        continue
+                    result = {"format": fmt, "rows": rows, "cols": cols,
+                              "file_mb": round(os.path.getsize(path) / 1024 / 1024, 2)}
+                    result.update(json.loads(out.stdout.strip().splitlines()[-1]))
+                    results.append(result)
+                    print(f"{fmt:<5}{rows:>9} rows {cols:>4} cols  {op:<8} p50 {result['p50_ms']:>9.1f} ms  "
+                          f"p99 {result['p99_ms']:>9.1f} ms  {result['rows_per_sec']:>10} rows/s  "
+                          f"peak RSS {result['peak_rss_mb']:>7.1f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"commit": current_commit(), "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                       "env": args.env, "results": results}, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Cold start: time from launching the app process to its first response.
+
+Each run starts a fresh interpreter that imports app, swaps in the fakes from
+benchmarks/fakes.py and serves with werkzeug, then sends one request:
+
+    healthz   GET  /healthz
+    index     GET  /
+    hook      POST /hook with a synthetic GCS event (timed until the 2xx ack)
+
+Reported: import time inside the server, and wall time from process launch to
+the response (what a Pub/Sub delivery waits for on a scale-from-zero start).
+
+    python benchmarks/bench_startup.py --runs 5 --output after.json
+    python benchmarks/bench_startup.py --runs 5 --env WARMUP_ON_START=1
+"""
+import argparse
+import base64
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_load_paths import ROOT  # noqa: F401  (ROOT puts the app on sys.path)
+
+BUCKET = "bench-bucket"
+OBJECT = "startup.csv"
+REQUESTS = {
+    "healthz": ("GET", "/healthz", None),
+    "index": ("GET", "/", None),
+    "hook": ("POST", "/hook", {"message": {"data": base64.b64encode(json.dumps(
+        {"bucket": BUCKET, "name": OBJECT, "generation": "1"}).encode()).decode()}}),
+}
+
+
+def run_server():
+    os.environ.setdefault("PROCESSED_INDEX_BACKEND", "none")
+    os.environ.setdefault("INGEST_HISTORY_PATH", ":memory:")
+    start = time.perf_counter()
+    import app
+    import_seconds = time.perf_counter() - start
+    import fakes
+    from werkzeug.serving import make_server
+
+    store = tempfile.mkdtemp(prefix="fake-gcs-")
+    os.makedirs(os.path.join(store, BUCKET))
+    with open(os.path.join(store, BUCKET, OBJECT), "w") as f:
+        f.write("id,value\n1,2\n")
+    app.storage_client = fakes.FakeStorageClient(store)
+    app.bq_client = fakes.FakeBigQueryClient(datasets=["bench"], storage=app.storage_client)
+    app.PROJECT_ID = "bench-project"
+    app.BQ_DATASET = "bench"
+    server = make_server("127.0.0.1", 0, app.app, threaded=True)
+    print(json.dumps({"port": server.server_port, "import_seconds": import_seconds}), flush=True)
+    server.serve_forever()
+
+
+def measure(name, env):
+    method, path, body = REQUESTS[name]
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--server"],
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=env)
+    try:
+        ready = json.loads(server.stdout.readline())
+        conn = http.client.HTTPConnection("127.0.0.1", ready["port"], timeout=120)
+        payload = json.dumps(body) if body else None
+        conn.request(method, path, body=payload, headers={"Content-Type": "application/json"} if body else {})
+        response = conn.getresponse()
+        response.read()
+        elapsed = time.perf_counter() - start
+        conn.close()
+    finally:
+        server.terminate()
+        server.wait()
+    return {"import_seconds": ready["import_seconds"], "first_response_seconds": elapsed,
+            "status": response.status}
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", nargs="+", choices=list(REQUESTS), default=list(REQUESTS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Environment setting for the app under test (repeatable)")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--server", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.server:
+        run_server()
+        return
+
+    env = dict(os.environ)
+    env.update(item.split("=", 1) for item in args.env)
+    results = []
+    for name in args.requests:
+        runs = [measure(name, env) for _ in range(args.runs)]
+        result = {
+            "request": name,
+            "status": sorted({r["status"] for r in runs}),
+            "import_ms": round(statistics.median(r["import_seconds"] for r in runs) * 1000, 1),
+            "first_response_ms": round(statistics.median(r["first_response_seconds"] for r in runs) * 1000, 1),
+        }
+        results.append(result)
+        print(f"{name:<8} import {result['import_ms']:>8.1f} ms  launch-to-response "
+              f"{result['first_response_ms']:>8.1f} ms  HTTP {result['status']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"commit": current_commit(), "env": args.env, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Server-side memory of UI uploads (POST / with a multipart file).
+
+The app runs in its own process behind werkzeug's threaded server with the
+fakes from benchmarks/fakes.py, and the client streams the multipart body from
+disk, so only the server's memory is measured. RssAnon (heap) is sampled while
+the requests run; VmHWM also counts file-backed pages such as the spool mmap,
+which the kernel can drop under pressure.
+
+    python benchmarks/bench_upload_memory.py --rows 1000000 --concurrency 1 4 8
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from bench_load_paths import ROOT  # noqa: F401  (ROOT puts the app on sys.path)
+from bench_pipeline import BUCKET, make_file
+
+
+def proc_status(pid):
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("VmHWM", "VmRSS", "RssAnon"):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def run_server():
+    os.environ.setdefault("PROCESSED_INDEX_BACKEND", "none")
+    os.environ.setdefault("INGEST_HISTORY_PATH", ":memory:")
+    import app
+    import fakes
+    from werkzeug.serving import make_server
+
+    store = tempfile.mkdtemp(prefix="fake-gcs-")
+    os.makedirs(os.path.join(store, BUCKET))
+    app.storage_client = fakes.FakeStorageClient(store)
+    app.bq_client = fakes.FakeBigQueryClient(datasets=["bench"], storage=app.storage_client)
+    app.PROJECT_ID = "bench-project"
+    app.BQ_DATASET = "bench"
+    server = make_server("127.0.0.1", 0, app.app, threaded=True)
+    print(server.server_port, flush=True)
+    server.serve_forever()
+
+
+def post_file(port, path, action):
+    """POST / with the file streamed from disk; returns the HTTP status."""
+    boundary = uuid.uuid4().hex
+    fields = f"--{boundary}\r\nContent-Disposition: form-data; name=\"action\"\r\n\r\n{action}\r\n"
+    fields += f"--{boundary}\r\nContent-Disposition: form-data; name=\"buckets\"\r\n\r\n{BUCKET}\r\n"
+    head = (fields + f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; "
+            f"filename=\"{os.path.basename(path)}\"\r\nContent-Type: text/csv\r\n\r\n").encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+    conn.putrequest("POST", "/")
+    conn.putheader("Content-Type", f"multipart/form-data; boundary={boundary}")
+    conn.putheader("Content-Length", str(len(head) + os.path.getsize(path) + len(tail)))
+    conn.endheaders()
+    conn.send(head)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                break
+            conn.send(chunk)
+    conn.send(tail)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.status
+
+
+def measure(path, action, concurrency):
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--server"],
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        port = int(server.stdout.readline())
+        idle = proc_status(server.pid)
+        peak_anon = idle["RssAnon"]
+        statuses = []
+        threads = [threading.Thread(target=lambda: statuses.append(post_file(port, path, action)))
+                   for _ in range(concurrency)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        while any(t.is_alive() for t in threads):
+            peak_anon = max(peak_anon, proc_status(server.pid)["RssAnon"])
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        status = proc_status(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "action": action,
+        "concurrency": concurrency,
+        "statuses": sorted(set(statuses)),
+        "seconds": round(elapsed, 3),
+        "idle_rss_mb": round(idle["VmRSS"] / 1024, 1),
+        "peak_anon_delta_mb": round((peak_anon - idle["RssAnon"]) / 1024, 1),
+        "peak_rss_mb": round(status["VmHWM"] / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--cols", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--actions", nargs="+", choices=["preview", "upload"], default=["preview", "upload"])
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "trigger-bench"))
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--server", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.server:
+        run_server()
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = []
+    for rows in args.rows:
+        path = os.path.join(args.data_dir, f"pipeline_{rows}x{args.cols}.csv")
+        if not os.path.exists(path):
+            print(f"generating {path} ...", file=sys.stderr)
+            make_file(path, "csv", rows, args.cols)
+        for action in args.actions:
+            for concurrency in args.concurrency:
+                result = measure(path, action, concurrency)
+                result.update(rows=rows, file_mb=round(os.path.getsize(path) / 1024 / 1024, 1))
+                results.append(result)
+                print(f"{rows:>10} rows ({result['file_mb']} MB)  {action:<8} x{concurrency:<3} "
+                      f"{result['seconds']:>8.2f}s  heap +{result['peak_anon_delta_mb']:>7.1f} MB  "
+                      f"peak RSS {result['peak_rss_mb']:>7.1f} MB  HTTP {result['statuses']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
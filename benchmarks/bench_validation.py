@@ -0,0 +1,141 @@
+"""Cost of the column-contract stage (INGEST_CONTRACTS) on the CSV ingest path.
+
+Every run ingests a synthetic CSV through _ingest_gcs_object() against the
+fakes in benchmarks/fakes.py, in a fresh subprocess, with:
+
+    none       no contract (inferred types, as before)
+    contract   a contract on every column: types, nullability, ranges, patterns
+    invalid    the same contract with --invalid-every rows broken (dead-lettered)
+
+Modes alternate round by round so drift on a shared machine hits them alike.
+Reported: median wall time, the validate stage on its own, and the overhead
+against "none" for the same file.
+
+    python benchmarks/bench_validation.py --rows 1000000 5000000 --cols 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_load_paths import ROOT, peak_rss_kb  # noqa: F401  (ROOT puts the app on sys.path)
+from bench_pipeline import BUCKET, make_file
+
+MODES = ("none", "contract", "invalid")
+
+
+def contract_for(cols):
+    """Contract matching bench_pipeline.make_file's int/float/string/date cycle."""
+    kinds = [
+        {"type": "INTEGER", "nullable": False, "min": 0},
+        {"type": "FLOAT", "max": 1e9},
+        {"type": "STRING", "pattern": "^value_"},
+        {"type": "DATE", "min": "2026-01-01", "max": "2026-12-31"},
+    ]
+    return {"columns": {f"col_{c}": kinds[c % 4] for c in range(cols)}}
+
+
+def break_rows(src, dst, every):
+    """Copy ``src`` with the first field of every ``every``-th data row unparseable."""
+    with open(src) as f, open(dst, "w") as out:
+        out.write(f.readline())
+        for i, line in enumerate(f, 1):
+            out.write(f"oops{line[line.index(','):]}" if i % every == 0 else line)
+
+
+def run_worker(path):
+    os.environ.setdefault("PROCESSED_INDEX_BACKEND", "none")
+    os.environ.setdefault("INGEST_HISTORY_PATH", ":memory:")
+    # Every mode parses in-process, as contracted objects always do
+    os.environ.setdefault("INGEST_URI_LOAD_MIN_BYTES", "-1")
+    import app
+    import fakes
+
+    store = tempfile.mkdtemp(prefix="fake-gcs-")
+    os.makedirs(os.path.join(store, BUCKET))
+    os.symlink(path, os.path.join(store, BUCKET, "bench.csv"))
+    app.storage_client = fakes.FakeStorageClient(store)
+    app.bq_client = fakes.FakeBigQueryClient(datasets=["bench"], storage=app.storage_client)
+    app.PROJECT_ID = "bench-project"
+    app.BQ_DATASET = "bench"
+    app.warm_up()  # a serving process has its imports done; time the ingest alone
+
+    trace = app.IngestTrace()
+    app._trace_local.trace = trace
+    start = time.perf_counter()
+    rows, _ = app._ingest_gcs_object(BUCKET, "bench.csv")
+    elapsed = time.perf_counter() - start
+    app._trace_local.trace = None
+    print(json.dumps({
+        "rows_loaded": rows,
+        "rows_rejected": dict(app.INGEST_REJECTED_ROWS.samples()).get("ingest_rejected_rows_total", 0),
+        "seconds": elapsed,
+        "validate_seconds": trace.stages.get("validate", 0.0),
+        "peak_rss_mb": round(peak_rss_kb() / 1024, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--invalid-every", type=int, default=1000, help="Break one row in this many")
+    parser.add_argument("--iterations", type=int, default=5, help="Rounds; every mode runs once per round")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "trigger-bench"))
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--worker", metavar="CSV", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker)
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = []
+    for rows in args.rows:
+        path = os.path.join(args.data_dir, f"pipeline_{rows}x{args.cols}.csv")
+        if not os.path.exists(path):
+            print(f"generating {path} ...", file=sys.stderr)
+            make_file(path, "csv", rows, args.cols)
+        broken = os.path.join(args.data_dir, f"pipeline_{rows}x{args.cols}.invalid{args.invalid_every}.csv")
+        if "invalid" in args.modes and not os.path.exists(broken):
+            break_rows(path, broken, args.invalid_every)
+        runs = {mode: [] for mode in args.modes}
+        for _ in range(args.iterations):
+            for mode in args.modes:
+                env = dict(os.environ)
+                if mode != "none":
+                    env["INGEST_CONTRACTS"] = json.dumps({"bench": contract_for(args.cols)})
+                out = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--worker", broken if mode == "invalid" else path],
+                    check=True, capture_output=True, text=True, env=env,
+                )
+                runs[mode].append(json.loads(out.stdout.strip().splitlines()[-1]))
+        baseline = None
+        for mode in args.modes:
+            result = {"mode": mode, "rows": rows, "cols": args.cols,
+                      "csv_mb": round(os.path.getsize(path) / 1024 / 1024, 1)}
+            result.update(runs[mode][-1])
+            for key in ("seconds", "validate_seconds"):
+                result[key] = round(statistics.median(r[key] for r in runs[mode]), 3)
+            result["peak_rss_mb"] = max(r["peak_rss_mb"] for r in runs[mode])
+            baseline = baseline or result["seconds"]
+            result["overhead_pct"] = round((result["seconds"] / baseline - 1) * 100, 1)
+            results.append(result)
+            print(f"{rows:>10} rows x{args.cols}  {mode:<9} {result['seconds']:>7.2f}s  "
+                  f"validate {result['validate_seconds']:>6.2f}s  {result['overhead_pct']:>+6.1f}%  "
+                  f"loaded {result['rows_loaded']}  rejected {result['rows_rejected']}  "
+                  f"peak RSS {result['peak_rss_mb']:>7.1f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""Local stand-ins for the GCS and BigQuery clients used by app.py.
+
+FakeStorageClient stores objects as files under a root directory (one
+sub-directory per bucket). FakeBigQueryClient accepts load/copy/query jobs,
+pays the same serialization cost as the real client, and records rows and
+bytes per job instead of sending anything over the network.
+
+    import app, fakes
+    app.storage_client = fakes.FakeStorageClient("/tmp/fake-gcs")
+    app.bq_client = fakes.FakeBigQueryClient(storage=app.storage_client)
+"""
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.chunk_size = None
+
+    @property
+    def path(self):
+        return os.path.join(self.bucket.root, self.name)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path) if self.exists() else None
+
+    @property
+    def generation(self):
+        return os.stat(self.path).st_mtime_ns if self.exists() else None
+
+    @property
+    def updated(self):
+        if not self.exists():
+            return None
+        return datetime.datetime.fromtimestamp(os.stat(self.path).st_mtime, datetime.timezone.utc)
+
+    md5_hash = None
+    crc32c = None
+    content_type = None
+
+    def reload(self, **kwargs):
+        if not self.exists():
+            raise FileNotFoundError(f"gs://{self.bucket.name}/{self.name}")
+
+    def open(self, mode="rb", chunk_size=None, **kwargs):
+        if "r" in mode:
+            return open(self.path, "rb")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        return open(self.path, "wb")
+
+    def download_as_bytes(self, start=None, end=None, **kwargs):
+        with open(self.path, "rb") as f:
+            f.seek(start or 0)
+            return f.read() if end is None else f.read(end - (start or 0) + 1)
+
+    def download_to_file(self, fileobj, **kwargs):
+        with open(self.path, "rb") as src:
+            shutil.copyfileobj(src, fileobj)
+
+    def download_to_filename(self, filename, **kwargs):
+        with open(filename, "wb") as f:
+            self.download_to_file(f)
+
+    def upload_from_file(self, fileobj, size=None, content_type=None, **kwargs):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "wb") as out:
+            shutil.copyfileobj(fileobj, out)
+
+    def upload_from_filename(self, filename, content_type=None, **kwargs):
+        with open(filename, "rb") as f:
+            self.upload_from_file(f)
+
+    def upload_from_string(self, data, content_type=None, **kwargs):
+        self.upload_from_file(io.BytesIO(data.encode() if isinstance(data, str) else data))
+
+
+class FakeBucket:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.root = os.path.join(client.root, name)
+
+    def blob(self, name, **kwargs):
+        return FakeBlob(self, name)
+
+    def get_blob(self, name, **kwargs):
+        blob = FakeBlob(self, name)
+        return blob if blob.exists() else None
+
+
+class FakeBlobIterator:
+    """Mimics google.api_core's HTTPIterator: iterable, with ``pages``."""
+
+    def __init__(self, blobs, page_size):
+        self._blobs = blobs
+        self._page_size = page_size or 1000
+        self.next_page_token = None
+
+    def __iter__(self):
+        return iter(self._blobs)
+
+    @property
+    def pages(self):
+        for i in range(0, len(self._blobs), self._page_size):
+            yield self._blobs[i:i + self._page_size]
+
+
+class FakeStorageClient:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def bucket(self, name):
+        return FakeBucket(self, name)
+
+    get_bucket = bucket
+
+    def list_buckets(self, **kwargs):
+        return [FakeBucket(self, name) for name in sorted(os.listdir(self.root))]
+
+    def list_blobs(self, bucket, prefix=None, page_size=None, start_offset=None, **kwargs):
+        bucket = bucket if isinstance(bucket, FakeBucket) else self.bucket(bucket)
+        names = []
+        for dirpath, _, files in os.walk(bucket.root):
+            names.extend(os.path.relpath(os.path.join(dirpath, f), bucket.root) for f in files)
+        names = sorted(
+            n for n in names
+            if n.startswith(prefix or "") and (start_offset is None or n >= start_offset)
+        )
+        return FakeBlobIterator([FakeBlob(bucket, n) for n in names], page_size)
+
+
+class FakeJob:
+    def __init__(self, rows=0, job_id=None):
+        self.output_rows = rows
+        self.job_id = job_id or "fake-job"
+
+    def result(self, *args, **kwargs):
+        return self
+
+
+class FakeQueryJob(FakeJob):
+    def __init__(self, rows):
+        super().__init__(len(rows))
+        self._rows = rows
+
+    def result(self, *args, **kwargs):
+        return list(self._rows)
+
+
+class FakeTable:
+    def __init__(self, table_id, schema=None, num_rows=0, expires=None):
+        self.table_id = table_id
+        self.schema = list(schema or [])
+        self.num_rows = num_rows
+        self.expires = expires
+
+
+class FakeDataset:
+    def __init__(self, dataset_id):
+        self.dataset_id = dataset_id
+
+
+class FakeBigQueryClient:
+    """Records every job as ``{"kind", "table", "rows", "bytes"}`` in ``jobs``.
+
+    ``bytes`` counts what the container sends; URI loads read ``gs://`` objects
+    from ``storage`` (a FakeStorageClient) server-side and send nothing. Load
+    job ids are unique: reusing one raises Conflict, as BigQuery does.
+    """
+
+    def __init__(self, datasets=("uploads",), storage=None):
+        self.tables = {}
+        self.jobs = []
+        self.datasets = list(datasets)
+        self.storage = storage
+        self._jobs_by_id = {}
+        self._lock = threading.Lock()
+
+    @property
+    def bytes_loaded(self):
+        return sum(job["bytes"] for job in self.jobs)
+
+    @property
+    def rows_loaded(self):
+        return sum(job["rows"] for job in self.jobs if job["kind"] != "copy")
+
+    def _record(self, kind, table_id, rows, nbytes, job_config=None, schema=None):
+        table_id, _, partition = str(table_id).partition("$")
+        with self._lock:
+            self.jobs.append({"kind": kind, "table": table_id, "rows": rows, "bytes": nbytes})
+            table = self.tables.get(table_id)
+            disposition = getattr(job_config, "write_disposition", None)
+            if kind in ("query",):
+                return
+            if table is None or (disposition == "WRITE_TRUNCATE" and not partition):
+                self.tables[table_id] = FakeTable(table_id, schema, rows)
+            else:
+                table.num_rows += rows
+                known = {f.name for f in table.schema}
+                table.schema.extend(f for f in schema or [] if f.name not in known)
+
+    def load_table_from_dataframe(self, dataframe, destination, job_config=None, **kwargs):
+        from google.cloud import bigquery
+        with tempfile.TemporaryFile() as tmp:
+            dataframe.to_parquet(tmp, engine="pyarrow", index=False)
+            nbytes = tmp.tell()
+        schema = getattr(job_config, "schema", None) or [
+            bigquery.SchemaField(str(c), "STRING") for c in dataframe.columns]
+        self._record("dataframe", destination, len(dataframe), nbytes, job_config, schema)
+        return FakeJob(len(dataframe))
+
+    def _claim_job_id(self, job_id):
+        if job_id is None:
+            return
+        with self._lock:
+            if job_id in self._jobs_by_id:
+                from google.api_core.exceptions import Conflict
+                raise Conflict(f"Already Exists: Job {job_id}")
+            self._jobs_by_id[job_id] = None
+
+    def get_job(self, job_id, **kwargs):
+        job = self._jobs_by_id.get(job_id)
+        if job is None:
+            from google.api_core.exceptions import NotFound
+            raise NotFound(f"Not found: Job {job_id}")
+        return job
+
+    def load_table_from_file(self, fileobj, destination, job_config=None, job_id=None, **kwargs):
+        import pyarrow.parquet as pq
+        self._claim_job_id(job_id)
+        # Streamed like the real upload so the fake doesn't hold the whole file
+        magic = None
+        nbytes = newlines = 0
+        while True:
+            chunk = fileobj.read(1024 * 1024)
+            if not chunk:
+                break
+            if magic is None:
+                magic = chunk[:4]
+            nbytes += len(chunk)
+            if magic != b"PAR1":
+                newlines += chunk.count(b"\n")
+        if magic == b"PAR1":
+            rows = pq.read_metadata(fileobj).num_rows  # footer only
+        else:
+            rows = max(newlines - (getattr(job_config, "skip_leading_rows", 0) or 0), 0)
+        self._record("file", destination, rows, nbytes, job_config, getattr(job_config, "schema", None))
+        job = FakeJob(rows, job_id)
+        if job_id is not None:
+            self._jobs_by_id[job_id] = job
+        return job
+
+    def load_table_from_json(self, json_rows, destination, job_config=None, **kwargs):
+        json_rows = list(json_rows)
+        nbytes = len("\n".join(json.dumps(r, default=str) for r in json_rows))
+        self._record("json", destination, len(json_rows), nbytes, job_config, getattr(job_config, "schema", None))
+        return FakeJob(len(json_rows))
+
+    def load_table_from_uri(self, source_uris, destination, job_config=None, **kwargs):
+        rows = 0
+        if self.storage is not None:
+            for uri in [source_uris] if isinstance(source_uris, str) else source_uris:
+                bucket, _, name = uri[len("gs://"):].partition("/")
+                with open(self.storage.bucket(bucket).blob(name).path, "rb") as f:
+                    newlines = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1024 * 1024), b""))
+                rows += max(newlines - (getattr(job_config, "skip_leading_rows", 0) or 0), 0)
+        self._record("uri", destination, rows, 0, job_config, getattr(job_config, "schema", None))
+        return FakeJob(rows)
+
+    def insert_rows_json(self, table, json_rows, **kwargs):
+        self._record("insert", table, len(json_rows), 0)
+        return []
+
+    def copy_table(self, sources, destination, job_config=None, **kwargs):
+        source = self.tables[str(sources)]
+        self._record("copy", destination, source.num_rows, 0, job_config, source.schema)
+        return FakeJob(source.num_rows)
+
+    def query(self, sql, **kwargs):
+        self._record("query", "", 0, 0)
+        return FakeQueryJob([])
+
+    def get_table(self, table):
+        table_id = str(getattr(table, "table_id", table))
+        if table_id not in self.tables:
+            from google.api_core.exceptions import NotFound
+            raise NotFound(f"Table {table_id} not found")
+        return self.tables[table_id]
+
+    def create_table(self, table, exists_ok=False, **kwargs):
+        table_id = f"{table.project}.{table.dataset_id}.{table.table_id}"
+        self.tables.setdefault(table_id, FakeTable(table_id, table.schema, expires=table.expires))
+        return self.tables[table_id]
+
+    def update_table(self, table, fields, **kwargs):
+        return table
+
+    def delete_table(self, table, not_found_ok=False, **kwargs):
+        self.tables.pop(str(table), None)
+
+    def list_datasets(self, **kwargs):
+        return [FakeDataset(d) for d in self.datasets]
+
+    def get_dataset(self, dataset_ref, **kwargs):
+        dataset_id = str(dataset_ref).split(".")[-1]
+        if dataset_id not in self.datasets:
+            from google.api_core.exceptions import NotFound
+            raise NotFound(f"Dataset {dataset_ref} not found")
+        return FakeDataset(dataset_id)
+
+    def create_dataset(self, dataset, exists_ok=False, **kwargs):
+        dataset_id = getattr(dataset, "dataset_id", str(dataset).split(".")[-1])
+        if dataset_id not in self.datasets:
+            self.datasets.append(dataset_id)
+        return FakeDataset(dataset_id)